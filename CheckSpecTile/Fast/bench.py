@@ -0,0 +1,352 @@
+'''This is a new file for this fast version of the program.
+
+It is a benchmark of the original and the fast versions of the
+program on fixed workloads, which also checks that all of them give
+the same answers. For example
+
+python bench.py --output bench.json
+
+runs all workloads below and writes the results to bench.json, so that
+the times of later versions can be compared with them.
+
+
+== Workloads ==
+
+The sets of each workload are always the same, since they are either
+slices of the enumeration of main_all.py or drawn with a fixed seed.
+
+early16, middle16, late16
+    200 consecutive subsets of size 16 in Z_2^6, at the start, the
+    middle, and the end of generate_sets_reduced(16).
+size8, size12
+    200 subsets of size 8 and 12 in Z_2^6 drawn from naive_generator
+    and generate_sets_reduced, or all 57 of size 8.
+d7
+    200 random subsets of size 16 in Z_2^7 that contain the fixed
+    elements.
+
+The number of subsets is set by --sets K, and the seed by --seed S.
+The original version is 500 to 1000 times slower, so it only checks
+the first 20 subsets of each workload, or the number set by
+--original-sets K.
+
+
+== What is timed ==
+
+is_spectral, is_tile
+    The time per subset of each engine: the clique engines 'list',
+    'bits' and 'colour' of spectral_tile.py, 'exact_cover' for is_tile,
+    'many' for is_spectral_many and is_tile_many on the whole
+    workload, 'incremental' for the evaluator of incremental.py (only
+    in Z_2^6), and 'original' for the original version.
+clique_exists_helper
+    The time per subset of the clique searches alone, for both
+    properties, on graphs computed beforehand. For the original
+    version this is clique_exists on its adjacency matrices.
+generate_sets_reduced
+    The time per subset of enumerating the slices early16, middle16
+    and late16 with generate_sets_reduced(16, start=...).
+
+Each time of the fast version is the best of 3 runs, or of --repeat R,
+after a first untimed run on one subset, which builds the tables.
+The answers of every engine are compared with those of 'list', and any
+difference is printed and recorded in the JSON file, and makes the
+script exit with status 1. The differences of the original version are
+recorded separately and do not, since its clique search can miss
+cliques (see clique_exists_helper in the file clique.py). The
+engine 'list' of this version had the same fault, which this script
+found on the workload d7.
+
+The original version runs in a separate process, started as
+python bench.py --original, since its files have the same names as
+those of this version. It reads the workload as JSON from its input
+and writes its answers and times to its output.
+'''
+
+import sys
+import os
+import json
+import time
+
+original_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'Original')
+
+def timed(f):
+    '''Return the result of f() and the seconds it took.'''
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+def run_original():
+    '''Check the sets of the workload read from the input with the
+    original version, and write the answers and times to the output.'''
+    workload = json.load(sys.stdin)
+    sys.path[0] = original_dir
+    sys.argv[1:] = [str(workload['dim'])]
+
+    import prelim
+    import spectral_tile
+    import clique
+    spectral_tile.quiet = True
+    clique.quiet = True
+
+    sets = workload['sets']
+    N, eval_matrix = prelim.N, prelim.eval_matrix
+
+    spectral, spectral_time = timed(lambda: [spectral_tile.is_spectral(E) for E in sets])
+    tile, tile_time = timed(lambda: [spectral_tile.is_tile(E) for E in sets])
+
+    '''The adjacency matrices built by is_spectral and is_tile.'''
+    graphs = []
+    for E in sets:
+        graphs.append(([[int(sum(eval_matrix[x][m] * eval_matrix[x][n] for x in E) == 0)
+                         for n in range(N)] for m in range(N)], len(E)))
+        if N % len(E) == 0:
+            translates = [set(x ^ m for x in E) for m in range(N)]
+            graphs.append(([[int(not translates[m] & translates[n]) for n in range(N)]
+                            for m in range(N)], N // len(E)))
+    cliques, clique_time = timed(lambda: [clique.clique_exists(graph, k, [0])
+                                          for graph, k in graphs])
+
+    json.dump({
+        'is_spectral': [spectral, spectral_time],
+        'is_tile': [tile, tile_time],
+        'clique_exists_helper': [cliques, clique_time],
+    }, sys.stdout)
+
+if __name__ == '__main__' and '--original' in sys.argv:
+    run_original()
+    sys.exit()
+
+import random
+import platform
+import subprocess
+
+def pop_option(name, default=None):
+    '''Remove the option name and the value following it from the
+    command line, and return the value, or default if the option
+    was not there.'''
+    if name in sys.argv:
+        i = sys.argv.index(name)
+        value = sys.argv[i+1]
+        del sys.argv[i:i+2]
+        return value
+    return default
+
+sets_per_workload = int(pop_option('--sets', 200))
+original_sets = int(pop_option('--original-sets', 20))
+repeat = int(pop_option('--repeat', 3))
+output = pop_option('--output', 'bench.json')
+seed = int(pop_option('--seed', 2024))
+
+import prelim
+prelim.set_dimension(6)
+
+import spectral_tile
+import clique
+from generate import naive_generator, generate_sets_reduced
+from generate import reduced_unrank, prefix_table
+from incremental import IncrementalEvaluator
+
+spectral_tile.quiet = True
+clique.quiet = True
+
+def workload_sets(name, rng):
+    '''Return the sets of the workload with the given name, and, for
+    the slices of generate_sets_reduced, the rank of the first one.'''
+    if name == 'd7':
+        context = prelim.get_context(7)
+        others = [x for x in range(context.N) if x not in context.fixed_elts]
+        return [context.fixed_elts + sorted(rng.sample(others, 16 - len(context.fixed_elts)))
+                for _ in range(sets_per_workload)], None
+
+    fixed_elts = prelim.fixed_elts
+    if name == 'size8':
+        sets = [fixed_elts + comb for comb in naive_generator(8)]
+        return [sets[i] for i in sorted(rng.sample(range(len(sets)),
+                                                   min(len(sets), sets_per_workload)))], None
+    if name == 'size12':
+        total = prefix_table(12)[1][-1]
+        return [fixed_elts + reduced_unrank(rank, 12)
+                for rank in sorted(rng.sample(range(total), sets_per_workload))], None
+
+    total = prefix_table(16)[1][-1]
+    start = {'early16': 0,
+             'middle16': total // 2,
+             'late16': total - sets_per_workload}[name]
+    return [fixed_elts + comb for comb, _ in
+            zip(generate_sets_reduced(16, start=start), range(sets_per_workload))], start
+
+workloads = {
+    'early16': 6,
+    'middle16': 6,
+    'late16': 6,
+    'size8': 6,
+    'size12': 6,
+    'd7': 7,
+}
+
+def best_time(f):
+    '''Return the result of f() and the least seconds it took in
+    repeat runs.'''
+    times = []
+    for _ in range(repeat):
+        result, seconds = timed(f)
+        times.append(seconds)
+    return result, min(times)
+
+def with_engine(engine, f):
+    '''Return a function that runs f with the given clique engine, or
+    tile engine 'exact_cover'.'''
+    def run():
+        if engine == 'exact_cover':
+            spectral_tile.tile_engine = 'exact_cover'
+        else:
+            spectral_tile.clique_engine = engine
+        try:
+            return f()
+        finally:
+            spectral_tile.clique_engine = 'list'
+            spectral_tile.tile_engine = 'clique'
+    return run
+
+def incremental_answers(sets, kind):
+    evaluator = IncrementalEvaluator()
+    answers = []
+    for E in sets:
+        evaluator.move_to(E)
+        answers.append(evaluator.is_spectral() if kind == 'spectral' else evaluator.is_tile())
+    return answers
+
+def graphs_of(sets, context):
+    '''Return the graphs of is_spectral and is_tile for the sets, as
+    triples (graph, k, candidates), for the clique engines.'''
+    N = context.N
+    graphs = []
+    for E in sets:
+        is_ortho_to_0 = [int(sum(context.eval_matrix[i][x] for x in E) == 0) for i in range(N)]
+        graphs.append((is_ortho_to_0, len(E) - 1))
+        if N % len(E) == 0:
+            is_nonoverlap_with_0 = [0] + [1] * (N-1)
+            for x in E:
+                for y in E:
+                    is_nonoverlap_with_0[x ^ y] = 0
+            graphs.append((is_nonoverlap_with_0, N // len(E) - 1))
+    return [(graph, k, [x for x in range(N) if graph[x]]) for graph, k in graphs]
+
+def clique_answers(engine, graphs):
+    search = spectral_tile.clique_engines[engine]
+    answers = []
+    for graph, k, candidates in graphs:
+        clique.cnt = 0
+        answers.append(search(graph, k, candidates))
+    return answers
+
+def run_workload(name, dim, rng):
+    context = prelim.get_context(dim)
+    sets, start = workload_sets(name, rng)
+    spectral_tile.is_spectral(sets[0], context)
+    spectral_tile.is_tile(sets[0], context)
+    spectral_tile.is_spectral_many(sets[:1], context)
+    timings = {}
+    answers = {}
+
+    def record(function, engine, result, seconds, count):
+        timings.setdefault(function, {})[engine] = {
+            'sets': count,
+            'seconds': seconds,
+            'us_per_set': 1e6 * seconds / count,
+        }
+        answers.setdefault(function, {})[engine] = result
+
+    for kind, check, check_many in [('spectral', spectral_tile.is_spectral, spectral_tile.is_spectral_many),
+                                    ('tile', spectral_tile.is_tile, spectral_tile.is_tile_many)]:
+        function = 'is_' + kind
+        engines = ['list', 'bits', 'colour'] + (['exact_cover'] if kind == 'tile' else [])
+        for engine in engines:
+            result, seconds = best_time(with_engine(engine, lambda: [check(E, context) for E in sets]))
+            record(function, engine, result, seconds, len(sets))
+        result, seconds = best_time(lambda: check_many(sets, context))
+        record(function, 'many', result, seconds, len(sets))
+        if dim == prelim.dim:
+            result, seconds = best_time(lambda: incremental_answers(sets, kind))
+            record(function, 'incremental', result, seconds, len(sets))
+
+    graphs = graphs_of(sets, context)
+    for engine in ['list', 'bits', 'colour']:
+        result, seconds = best_time(lambda: clique_answers(engine, graphs))
+        record('clique_exists_helper', engine, result, seconds, len(sets))
+
+    if start is not None:
+        result, seconds = best_time(lambda: [prelim.fixed_elts + comb for comb, _ in
+                                             zip(generate_sets_reduced(16, start=start), sets)])
+        record('generate_sets_reduced', 'fast', [result == sets], seconds, len(sets))
+
+    count = min(original_sets, len(sets))
+    if count > 0:
+        process = subprocess.run([sys.executable, os.path.abspath(__file__), '--original'],
+                                 input=json.dumps({'dim': dim, 'sets': sets[:count]}),
+                                 capture_output=True, text=True, check=True)
+        original = json.loads(process.stdout)
+        for function, (result, seconds) in original.items():
+            record(function, 'original', result, seconds, count)
+
+    '''Compare every engine with 'list' on the sets that both checked.'''
+    disagreements = []
+    original_disagreements = []
+    for function, by_engine in answers.items():
+        reference = by_engine.get('list', by_engine.get('fast'))
+        for engine, result in by_engine.items():
+            if function == 'generate_sets_reduced':
+                if result != [True]:
+                    disagreements.append([function, engine, 'different sets'])
+                continue
+            for i, (a, b) in enumerate(zip(result, reference)):
+                if a != b:
+                    (original_disagreements if engine == 'original' else disagreements) \
+                        .append([function, engine, i])
+
+    return {
+        'dim': dim,
+        'size': len(sets[0]),
+        'sets': len(sets),
+        'first_rank': start,
+        'timings': timings,
+        'disagreements': disagreements,
+        'original_disagreements': original_disagreements,
+    }
+
+if __name__ == '__main__':
+    rng = random.Random(seed)
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'sets': sets_per_workload,
+        'original_sets': original_sets,
+        'repeat': repeat,
+        'workloads': {},
+    }
+
+    for name, dim in workloads.items():
+        print('\nWorkload {}, d = {}'.format(name, dim))
+        report = run_workload(name, dim, rng)
+        results['workloads'][name] = report
+        for function, by_engine in report['timings'].items():
+            print('  {:<22}'.format(function) + '  '.join(
+                '{} {:.1f}'.format(engine, timing['us_per_set'])
+                for engine, timing in by_engine.items()))
+        for disagreement in report['disagreements']:
+            print('  Different answer:', disagreement)
+        for disagreement in report['original_disagreements']:
+            print('  Different answer of the original version:', disagreement)
+
+    results['agree'] = not any(report['disagreements']
+                               for report in results['workloads'].values())
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=1)
+
+    print('\nTimes in us per set. All engines agree:', results['agree'])
+    print('Written to', output)
+    if not results['agree']:
+        sys.exit(1)
@@ -0,0 +1,160 @@
+'''This is a new file for this fast version of the program.
+
+It keeps the answers for every subset checked by main_all.py with the
+option --bitmap FILE, so that they can be looked up later with the
+script query.py instead of checking the subsets again.
+
+The subsets are numbered by their rank, their position in the
+enumeration of naive_generator or generate_sets_reduced in
+lexicographic order, counting from 0 (see naive_rank and reduced_rank
+in the file generate.py). This is the case number of main_all.py
+minus 1. The subset of rank i has the 2 bits of byte i // 4 starting
+at bit 2 * (i % 4), its code: the lower bit is 1 if it is a spectral
+set, and the upper bit is 1 if it is a tile. So FILE has one byte for
+every 4 subsets, about 74 MB for the 295,137,078 subsets of size 16
+in Z_2^6, and it is read and written as a NumPy memmap, without
+loading it into memory.
+
+The code 0 also means that a subset was not checked, so the ranges of
+ranks that were checked are kept, together with d and n, in the JSON
+file FILE.json, which is only written after FILE itself. A run can
+fill in any ranges, for example with --start and --stop, and later
+runs can fill in more. The shards of a run (see the file runner.py)
+should each write their own file, and query.py can read them together.
+
+NumPy is only needed by this file and query.py.
+'''
+
+import json
+import os
+from math import comb
+
+import numpy as np
+
+import prelim
+from generate import get_tables, naive_unrank, reduced_unrank, prefix_table
+from runner import write_json_atomically
+
+def enumeration_size(size, context=None):
+    '''Return the number of subsets of the given size that main_all.py
+    enumerates with naive_generator or generate_sets_reduced.'''
+    context = context or prelim.default_context()
+    r = size - len(context.fixed_elts)
+    if r < 3:
+        return comb(len(get_tables(context).naive_pool), r)
+    prefixes, offsets = prefix_table(size, context)
+    return offsets[-1]
+
+def unrank(rank, size, context=None):
+    '''Return the subset E with the fixed elements of the given rank.'''
+    context = context or prelim.default_context()
+    fixed_elts = context.fixed_elts
+    if size - len(fixed_elts) < 3:
+        return fixed_elts + naive_unrank(rank, size, context)
+    return fixed_elts + reduced_unrank(rank, size, context)
+
+def pack(codes, offset):
+    '''Return the bytes holding the array of codes, the first of which
+    goes to position offset (0 <= offset < 4) of the first byte.
+
+    >>> pack(np.array([1, 2, 3], dtype=np.uint8), 3).tolist()
+    [64, 14]
+    '''
+    padded = np.zeros((offset + len(codes) + 3) // 4 * 4, dtype=np.uint8)
+    padded[offset:offset+len(codes)] = codes
+    return padded[0::4] | padded[1::4] << 2 | padded[2::4] << 4 | padded[3::4] << 6
+
+def unpack(data):
+    '''Return the array of the codes in the bytes data, 4 for each byte.
+
+    >>> unpack(np.array([64, 14], dtype=np.uint8)).tolist()
+    [0, 0, 0, 1, 2, 3, 0, 0]
+    '''
+    shifts = np.array([0, 2, 4, 6], dtype=np.uint8)
+    return ((data[:, None] >> shifts) & 3).reshape(-1)
+
+def merge_ranges(ranges):
+    '''Return the union of the ranges [start, stop) as a sorted list
+    of disjoint ranges.
+
+    >>> merge_ranges([[5, 9], [0, 3], [3, 4], [8, 12]])
+    [[0, 4], [5, 12]]
+    '''
+    merged = []
+    for start, stop in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], stop)
+        else:
+            merged.append([start, stop])
+    return merged
+
+def read_header(path):
+    with open(path + '.json') as f:
+        return json.load(f)
+
+class ResultBitmap:
+    '''The codes of the subsets of the given size in the file path,
+    and the list ranges of the ranges of ranks written to it, for the
+    dimension of context, by default the default context.'''
+
+    def __init__(self, path, size, context=None):
+        self.path = path
+        self.size = size
+        self.dim = (context or prelim.default_context()).dim
+        self.total = enumeration_size(size, context)
+        if os.path.exists(path) and os.path.exists(path + '.json'):
+            header = read_header(path)
+            if (header['dim'], header['size']) != (self.dim, size):
+                raise ValueError('{} has the subsets of size {} in Z_2^{}'
+                                 .format(path, header['size'], header['dim']))
+            self.ranges = header['ranges']
+            mode = 'r+'
+        else:
+            self.ranges = []
+            mode = 'w+'
+        self.data = np.memmap(path, dtype=np.uint8, mode=mode,
+                              shape=((self.total + 3) // 4,))
+
+    def write(self, start, codes):
+        '''Write the codes, a bytearray, of the subsets of ranks
+        start, start+1, and so on.
+
+        The bytes at both ends may be shared with other ranges, so only
+        the 2 bits of each subset written are cleared, and the new codes
+        are combined with the rest by |. So writing a range again, as
+        after --resume or with another engine, replaces its old codes.
+
+        >>> bits = ResultBitmap.__new__(ResultBitmap)
+        >>> bits.data, bits.ranges = np.array([0b11100111], dtype=np.uint8), []
+        >>> bits.write(1, bytearray([1, 0]))
+        >>> format(bits.data[0], '08b')
+        '11000111'
+        '''
+        if not codes:
+            return
+        packed = pack(np.frombuffer(bytes(codes), dtype=np.uint8), start % 4)
+        slots = pack(np.full(len(codes), 3, dtype=np.uint8), start % 4)
+        window = self.data[start // 4 : start // 4 + len(packed)]
+        window &= ~slots
+        window |= packed
+        self.ranges = merge_ranges(self.ranges + [[start, start + len(codes)]])
+
+    def sync(self):
+        '''Write the changes to the disk, and then FILE.json.'''
+        self.data.flush()
+        write_json_atomically(self.path + '.json', {
+            'dim': self.dim,
+            'size': self.size,
+            'total': self.total,
+            'ranges': self.ranges,
+        })
+
+def matching_ranks(data, ranges, mask, value, chunk=1 << 22):
+    '''Yield arrays of the ranks in the given ranges of the subsets whose
+    code c has c & mask == value, reading chunk bytes of data at a time.'''
+    for start, stop in ranges:
+        for first in range(start // 4 * 4, stop, 4 * chunk):
+            last = min(first + 4 * chunk, stop)
+            codes = unpack(np.asarray(data[first // 4 : (last + 3) // 4]))
+            ranks = np.flatnonzero((codes & mask) == value) + first
+            yield ranks[(ranks >= start) & (ranks < last)]
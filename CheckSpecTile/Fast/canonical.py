@@ -0,0 +1,295 @@
+'''This is a new file for this fast version of the program.
+
+It decides whether a subset of Z_2^d is the smallest in its orbit
+under a group of affine maps that fix the set of fixed elements
+0, e_1, ..., e_d of prelim.py. It is used by generate_sets_canonical
+in generate.py.
+
+
+== The group ==
+
+Call the fixed elements the points p_0 = 0, p_1 = e_1, ..., p_d = e_d.
+Every x in Z_2^d is the sum of an odd number of points in exactly
+one way: if x has an odd number of 1's, it is the sum of the p_i
+with x_i = 1, and otherwise we also add p_0. So x corresponds to an
+odd-size subset B(x) of the points, and the fixed elements themselves
+correspond to the subsets of size 1.
+
+An affine map permuting the points is the same as a permutation of
+the points, acting on the subsets B(x). These maps form a group of
+order (d+1)!, which contains the permutations of coordinates, the
+maps that fix p_0. Being a spectral set or a tile is invariant under
+affine maps, so it suffices to check one set in each orbit.
+
+In the code, B(x) is stored as the integer with bit i set if p_i is
+in B(x), that is, (x << 1) plus 1 if x has an even number of 1's.
+Then x is B(x) >> 1, and x < y if and only if B(x) >> 1 < B(y) >> 1.
+
+
+== The ordering ==
+
+As in generate.py, a set of non-fixed elements R is smaller than
+another set of the same size if, after sorting both in increasing
+order, it is smaller in the lexicographic ordering. R is canonical if
+it is not larger than any of its images.
+
+If R is canonical, then so is R without its largest element M.
+Indeed, let g be a map and let u be the smallest element of the
+symmetric difference of R' = R - {M} and g(R'). If u were in g(R'),
+then u < M, since otherwise g(R') would contain R' and another
+element. Then g(M) is either in R or larger than u, or else it is
+in g(R) - R and smaller than u, and in all cases g(R) < R.
+
+So the canonical sets of size r are found by adding elements to the
+canonical sets of size r-1, larger than all of their elements, and
+keeping those that are canonical. This is called orderly generation.
+
+
+== The test ==
+
+is_canonical looks for the smallest image of R step by step. The maps
+that send the first k elements of R to themselves permute the points
+within each cell of a partition of the points, where two points are
+in the same cell if they lie in the same B(x) for the first k
+elements x of R. The smallest image of B(y) under these maps is found
+by moving the points of B(y) in each cell to the smallest points of
+that cell.
+
+So if some other element has a smallest image below the (k+1)-th
+element of R, then R is not canonical. For each element whose smallest
+image is the (k+1)-th element of R, we apply one of the maps that send
+it there, split the cells by the new element, and go on.
+
+The group is given by the partition of the points at the start:
+simplex_cells(context) gives the group of order (d+1)! above, and
+coordinate_cells(context) gives the permutations of coordinates only,
+for the dimension of a context of prelim.py, by default the default
+context. The cells cover all d+1 points, so the other functions find
+d from them, and their tables can hold several dimensions at once.
+'''
+
+import prelim
+
+def to_points(x):
+    '''
+    >>> to_points(3) == 0b111
+    True
+    >>> to_points(7) == 0b1110
+    True
+    '''
+    return (x << 1) | (1 - bin(x).count('1') % 2)
+
+def simplex_cells(context=None):
+    dim = (context or prelim.default_context()).dim
+    return ((1 << (dim+1)) - 1,)
+
+def coordinate_cells(context=None):
+    dim = (context or prelim.default_context()).dim
+    return (1, (1 << (dim+1)) - 2)
+
+def point_count(cells):
+    '''Return the number d+1 of points, which the cells cover.'''
+    return sum(cells).bit_length()
+
+# lowest[(cell, k)] is the set of the k smallest points of cell.
+lowest = {}
+
+def lowest_points(cell, k):
+    key = (cell, k)
+    if key not in lowest:
+        mask = 0
+        for i in range(cell.bit_length()):
+            if k == 0:
+                break
+            if cell >> i & 1:
+                mask |= 1 << i
+                k -= 1
+        lowest[key] = mask
+    return lowest[key]
+
+def smallest_image(b, cells):
+    '''Return the smallest image of b under the permutations of points
+    that preserve every cell.
+
+    >>> smallest_image(0b1110, simplex_cells()) == 0b111
+    True
+    >>> smallest_image(0b1110, coordinate_cells()) == 0b1110
+    True
+    '''
+    image = 0
+    for cell in cells:
+        image |= lowest_points(cell, bin(b & cell).count('1'))
+    return image
+
+# image_tables[cells][b] is smallest_image(b, cells).
+image_tables = {}
+
+def image_table(cells):
+    if cells not in image_tables:
+        image_tables[cells] = [smallest_image(b, cells)
+                               for b in range(1 << point_count(cells))]
+    return image_tables[cells]
+
+# splits[(cells, b)] is split(cells, b).
+splits = {}
+
+def split(cells, b):
+    '''Split every cell into its points in b and its points not in b.'''
+    key = (cells, b)
+    if key not in splits:
+        result = []
+        for cell in cells:
+            if cell & b:
+                result.append(cell & b)
+            if cell & ~b:
+                result.append(cell & ~b)
+        splits[key] = tuple(sorted(result))
+    return splits[key]
+
+def sending_map(b, target, cells):
+    '''Return a permutation of the points, as a list, that preserves
+    every cell and sends b to target. They have the same number of
+    points in each cell.'''
+    points = point_count(cells)
+    perm = [None] * points
+    for cell in cells:
+        for src, dst in [(cell & b, cell & target), (cell & ~b, cell & ~target)]:
+            src_points = [i for i in range(points) if src >> i & 1]
+            dst_points = [i for i in range(points) if dst >> i & 1]
+            for i, j in zip(src_points, dst_points):
+                perm[i] = j
+    return perm
+
+def apply_map(perm, b):
+    image = 0
+    for i in range(len(perm)):
+        if b >> i & 1:
+            image |= 1 << perm[i]
+    return image
+
+# map_tables[(b, target, cells)][c] is the image of c under
+# sending_map(b, target, cells).
+map_tables = {}
+
+def map_table(b, target, cells):
+    key = (b, target, cells)
+    if key not in map_tables:
+        perm = sending_map(b, target, cells)
+        map_tables[key] = [apply_map(perm, c) for c in range(1 << len(perm))]
+    return map_tables[key]
+
+def is_canonical(R, cells=None):
+    '''Return whether the sorted list R of non-fixed elements is not
+    larger than any of its images under the group given by cells,
+    by default simplex_cells().
+
+    >>> is_canonical([3, 5, 6])
+    True
+    >>> is_canonical([3, 5, 7])
+    False
+    >>> is_canonical([3, 5, 7], coordinate_cells())
+    True
+    '''
+    cells = cells or simplex_cells()
+    targets = [to_points(x) for x in R]
+    return search(list(targets), targets, 0, cells)
+
+def search(images, targets, k, cells):
+    '''images are the images of the elements of R not yet sent to one
+    of targets[:k], under a map sending the others there. cells are the
+    cells of the maps that fix targets[:k].'''
+    if k == len(targets):
+        return True
+    if len(cells) == point_count(cells):
+        # Only the identity is left.
+        return sorted(b >> 1 for b in images) >= [b >> 1 for b in targets[k:]]
+
+    target = targets[k]
+    value = target >> 1
+    table = image_table(cells)
+    matching = []
+    for i, b in enumerate(images):
+        image = table[b]
+        if image >> 1 < value:
+            return False
+        if image == target:
+            matching.append(i)
+
+    new_cells = split(cells, target)
+    for i in matching:
+        b = images[i]
+        rest = images[:i] + images[i+1:]
+        if b != target:
+            images_of = map_table(b, target, cells)
+            rest = [images_of[c] for c in rest]
+        if not search(rest, targets, k+1, new_cells):
+            return False
+    return True
+
+def smallest_form(E, cells=None):
+    '''Return the smallest image of the set E under the group given by
+    cells, by default coordinate_cells(), sorted. Two sets have the same smallest form if and only if
+    one is an image of the other, so it can serve as a key for both.
+
+    It is found as in is_canonical: the smallest element of an image
+    is the smallest of the smallest images of the elements, and every
+    element with that smallest image is tried in turn as the one sent
+    there, keeping the best form found so far to cut the search short.
+
+    >>> smallest_form([12, 0])
+    [0, 3]
+    '''
+    cells = cells or coordinate_cells()
+    best = None
+
+    def extend(images, form, cells):
+        nonlocal best
+        if best is not None and form > best[:len(form)]:
+            return
+        if not images or len(cells) == point_count(cells):
+            form = form + sorted(b >> 1 for b in images)
+            if best is None or form < best:
+                best = form
+            return
+
+        table = image_table(cells)
+        target = min(table[b] for b in images)
+        new_cells = split(cells, target)
+        for i, b in enumerate(images):
+            if table[b] == target:
+                rest = images[:i] + images[i+1:]
+                if b != target:
+                    images_of = map_table(b, target, cells)
+                    rest = [images_of[c] for c in rest]
+                extend(rest, form + [target >> 1], new_cells)
+
+    extend([to_points(x) for x in E], [], cells)
+    return best
+
+def canonical_form(E, context=None):
+    '''Return a sorted list that is the same for E and all its images
+    under permutations of coordinates, and differs for sets that are
+    not images of each other, for E in Z_2^d with d the dimension of
+    context.
+
+    smallest_form alone tries up to d! maps when E has much symmetry,
+    as the sets with the fixed elements do at first. So the coordinates
+    are first sorted by an invariant, the sorted list of the numbers
+    of 1's of the elements of E that have a 1 there, and smallest_form
+    then only permutes coordinates with the same invariant.
+
+    >>> canonical_form([0, 12]) == canonical_form([0, 3])
+    True
+    '''
+    dim = (context or prelim.default_context()).dim
+    invariants = [sorted(bin(x).count('1') for x in E if x >> i & 1) for i in range(dim)]
+    order = sorted(range(dim), key=lambda i: invariants[i])
+    relabeled = [sum((x >> i & 1) << j for j, i in enumerate(order)) for x in E]
+
+    cells = [1]
+    for j, i in enumerate(order):
+        if j > 0 and invariants[i] == invariants[order[j-1]]:
+            cells[-1] |= 1 << (j+1)
+        else:
+            cells.append(1 << (j+1))
+    return smallest_form(relabeled, tuple(sorted(cells)))
@@ -21,28 +21,42 @@
 
 Further changes are explained in the comments below.
 
-In this fast version, the function clique_exists_helper accounts
-for about 21% of the total runtime.
+In this fast version, the clique searches account for about 24% of
+the total runtime for the first 60,000 subsets of size 16 in Z_2^6,
+and for about 9% for 60,000 subsets from the middle of the
+enumeration, as measured with main_all.py --stats (see the file
+stats.py).
 '''
 
+from collections import OrderedDict
+
+import stats
+
 quiet = False
 cnt = None
 
+def print_progress(k, candidates):
+    if cnt == 30:
+        print('\nSwitching to printing less output.\n')
+
+    if cnt < 30:
+        print('Recursion {}: {}-clique, nodes = {}'.format(cnt, k, candidates))
+    elif (cnt < 1000 and cnt % 100 == 0) or (cnt < 30000 and cnt % 1000 == 0) \
+         or cnt % 5000 == 0:
+            print('Recursion {}'.format(cnt))
+
 def clique_exists_helper(graph, k, candidates):
     global cnt
     cnt += 1
+    if stats.enabled:
+        stats.reached(k)
     
     if not quiet:
-        if cnt == 30:
-            print('\nSwitching to printing less output.\n')
-
-        if cnt < 30:
-            print('Recursion {}: {}-clique, nodes = {}'.format(cnt, k, candidates))
-        elif (cnt < 1000 and cnt % 100 == 0) or (cnt < 30000 and cnt % 1000 == 0) \
-             or cnt % 5000 == 0:
-                print('Recursion {}'.format(cnt))   
+        print_progress(k, candidates)
     
     if len(candidates) < k:
+        if stats.enabled:
+            stats.prune('few_candidates')
         return False
     
     if k <= 1:
@@ -81,6 +95,8 @@ def clique_exists_helper(graph, k, candidates):
         else:
             remaining -= 1
             if remaining < k:
+                if stats.enabled:
+                    stats.prune('degree')
                 return False
 
     candidates = new_candidates
@@ -96,6 +112,8 @@ def clique_exists_helper(graph, k, candidates):
     and this can be directly checked.
     '''
     if len(candidates) == k:
+        if stats.enabled:
+            stats.prune('exactly_k')
         for x in candidates:
             for y in candidates:
                 if y > x and not graph[x ^ y]:
@@ -103,13 +121,504 @@ def clique_exists_helper(graph, k, candidates):
         return True
     '''End of block of code'''
 
-    for candidate in candidates:
-        new_candidates = [x for x in candidates if graph[x ^ candidate]]
+    '''The original code for this loop removes each candidate from the
+    list after searching it, while iterating over the same list, so
+    the candidate following it is skipped, and cliques through it can
+    be missed. This happens for some subsets of size 16 in Z_2^7 (see
+    the file bench.py). Here the candidates already searched are
+    skipped by their index instead.'''
+    for i, candidate in enumerate(candidates):
+        if len(candidates) - i < k:
+            if stats.enabled:
+                stats.prune('few_candidates')
+            return False
+        new_candidates = [x for x in candidates[i+1:] if graph[x ^ candidate]]
         if clique_exists_helper(graph, k-1, new_candidates):
             return True
 
-        candidates.remove(candidate)
-        if len(candidates) < k:
+    return False
+
+
+'''== The bitset engine ==
+
+The functions below are a second implementation of the same search.
+They take the same inputs as clique_exists_helper, so that the
+functions in spectral_tile.py can switch between the two engines.
+
+Here a set of nodes is represented by an N-bit integer whose bit x
+is set if and only if node x is in the set.
+
+The graph is again a Cayley graph, so the neighbourhood of node x
+is the translate of the neighbourhood of node 0 by x. Translating
+by 2^i swaps adjacent blocks of 2^i bits, which is two shifts and
+two masks.
+
+Then the list comprehension building new_candidates becomes a single
+AND, and the degree filter becomes one popcount per candidate instead
+of a loop over all candidates.
+
+The neighbourhood of node x is obtained by one such swap from that
+of node x with its highest bit cleared.
+'''
+
+try:
+    popcount = int.bit_count
+except AttributeError:
+    def popcount(mask):
+        return bin(mask).count('1')
+
+_low_halves = {}
+
+def low_halves(N):
+    '''The list whose i-th entry is the set of nodes x with bit i of x
+    equal to 0. It is computed once per N.
+
+    >>> [bin(m) for m in low_halves(8)]
+    ['0b1010101', '0b110011', '0b1111']
+    '''
+    if N not in _low_halves:
+        halves = []
+        b = 1
+        while b < N:
+            halves.append(sum(1 << x for x in range(N) if not x & b))
+            b <<= 1
+        _low_halves[N] = halves
+    return _low_halves[N]
+
+def to_mask(nodes):
+    mask = 0
+    for x in nodes:
+        mask |= 1 << x
+    return mask
+
+def to_nodes(mask):
+    '''
+    >>> to_nodes(to_mask([5, 0, 3]))
+    [0, 3, 5]'''
+    nodes = []
+    while mask:
+        low = mask & -mask
+        nodes.append(low.bit_length() - 1)
+        mask ^= low
+    return nodes
+
+# Maps the bytes 0 and 1 to the characters '0' and '1'.
+_binary_digits = bytes.maketrans(b'\x00\x01', b'01')
+
+def graph_mask(graph):
+    '''
+    >>> graph_mask([0, 1, 0, 1]) == 0b1010
+    True'''
+    return int(bytes(reversed(graph)).translate(_binary_digits), 2)
+
+class Neighbourhoods(dict):
+    '''The neighbourhoods of the nodes as bitsets, indexed by node.
+    The graph is given by the bitset of the neighbourhood of node 0.
+
+    The neighbourhood of a node is only computed the first time it is
+    looked up. This matters because the search often returns False
+    after looking at the neighbourhoods of a few nodes only.
+
+    >>> nbrs = Neighbourhoods(graph_mask([0, 1, 0, 1]), 4)
+    >>> [to_nodes(nbrs[x]) for x in range(4)]
+    [[1, 3], [0, 2], [1, 3], [0, 2]]'''
+    def __init__(self, mask, N):
+        self[0] = mask
+        self.halves = low_halves(N)
+
+    def __missing__(self, x):
+        i = x.bit_length() - 1
+        b = 1 << i
+        half = self.halves[i]
+        mask = self[x ^ b]
+        mask = ((mask & half) << b) | ((mask >> b) & half)
+        self[x] = mask
+        return mask
+
+'''The transposition table.
+
+Different branches of the search often lead to the same set of
+candidates. If memo_size is positive, then the bitset engines
+remember, within one search, up to memo_size pairs (candidates, k)
+for which there is no k-clique, and skip them when they come up
+again. When the table is full, the least recently used entry is
+evicted.
+
+memo_hits and memo_misses count the lookups in the table. Unlike
+cnt, they are not reset at the start of each search, so that they
+can be totalled over many searches.
+'''
+memo_size = 0
+memo = None
+memo_hits = 0
+memo_misses = 0
+
+def start_memo():
+    global memo
+    if memo_size > 0:
+        memo = OrderedDict()
+    else:
+        memo = None
+
+def memoized(helper, nbrs, k, candidates):
+    global memo_hits, memo_misses
+    key = (candidates, k)
+    if key in memo:
+        memo_hits += 1
+        memo.move_to_end(key)
+        return False
+    memo_misses += 1
+
+    if helper(nbrs, k, candidates):
+        return True
+
+    memo[key] = None
+    if len(memo) > memo_size:
+        memo.popitem(last=False)
+    return False
+
+def filter_bits(nbrs, k, candidates, remaining):
+    '''The degree filter of clique_exists_helper for bitsets, where
+    remaining is the number of candidates. Return the candidates that
+    are adjacent to at least k-1 other candidates, or 0 as soon as it
+    is clear that fewer than k of them are left.'''
+    new_candidates = candidates
+    rest = candidates
+    while rest:
+        low = rest & -rest
+        rest ^= low
+        if popcount(nbrs[low.bit_length() - 1] & candidates) < k-1:
+            new_candidates ^= low
+            remaining -= 1
+            if remaining < k:
+                return 0
+    return new_candidates
+
+def is_clique_bits(nbrs, nodes):
+    rest = nodes
+    while rest:
+        low = rest & -rest
+        rest ^= low
+        if nbrs[low.bit_length() - 1] & nodes != nodes ^ low:
+            return False
+    return True
+
+def clique_exists_bits(graph, k, candidates):
+    if anchor:
+        return clique_exists_anchored_bits(clique_exists_bits_helper, graph, k, candidates)
+    start_memo()
+    nbrs = Neighbourhoods(graph_mask(graph), len(graph))
+    return clique_exists_bits_helper(nbrs, k, to_mask(candidates))
+
+def clique_exists_bits_helper(nbrs, k, candidates):
+    '''Same as clique_exists_helper, except that the graph is given by
+    the list nbrs of neighbourhoods and candidates is a bitset.'''
+    global cnt
+    cnt += 1
+    if stats.enabled:
+        stats.reached(k)
+
+    if not quiet:
+        print_progress(k, to_nodes(candidates))
+
+    remaining = popcount(candidates)
+    if remaining < k:
+        if stats.enabled:
+            stats.prune('few_candidates')
+        return False
+
+    if k <= 1:
+        return True
+
+    '''For k = 2 and k = 3, we look directly for an edge and for a
+    triangle, respectively, without recursing.'''
+    if k == 2:
+        rest = candidates
+        while rest:
+            low = rest & -rest
+            if nbrs[low.bit_length() - 1] & candidates:
+                return True
+            rest ^= low
+        return False
+
+    if k == 3:
+        rest = candidates
+        while rest:
+            low = rest & -rest
+            rest ^= low
+            common = nbrs[low.bit_length() - 1] & rest
+            others = common
+            while others:
+                low = others & -others
+                if nbrs[low.bit_length() - 1] & common:
+                    return True
+                others ^= low
+        return False
+
+    '''The degree filter, and the check for exactly k candidates,
+    as in clique_exists_helper.'''
+    candidates = filter_bits(nbrs, k, candidates, remaining)
+    if not candidates:
+        if stats.enabled:
+            stats.prune('degree')
+        return False
+
+    remaining = popcount(candidates)
+    if remaining == k:
+        if stats.enabled:
+            stats.prune('exactly_k')
+        return is_clique_bits(nbrs, candidates)
+
+    rest = candidates
+    while rest:
+        low = rest & -rest
+        rest ^= low
+        new_candidates = nbrs[low.bit_length() - 1] & candidates
+        if memo is None:
+            found = clique_exists_bits_helper(nbrs, k-1, new_candidates)
+        else:
+            found = memoized(clique_exists_bits_helper, nbrs, k-1, new_candidates)
+        if found:
+            return True
+
+        candidates ^= low
+        remaining -= 1
+        if remaining < k:
+            if stats.enabled:
+                stats.prune('few_candidates')
+            return False
+
+    return False
+
+
+'''== The colouring bound ==
+
+The function clique_exists_colour is a third engine, again taking
+the same inputs as clique_exists_helper. It uses the bitsets of the
+bitset engine above, and after the same degree filter it prunes by
+a greedy colouring of the candidates that are left, in the style of
+the maximum clique algorithms of Tomita et al.
+
+If the candidates can be coloured with fewer than k colours, then
+there is no k-clique among them. Moreover, if the nodes are branched
+on in the reverse order of their colours, then as soon as a node of
+colour less than k is reached, the nodes that remain can be coloured
+with fewer than k colours, so the whole branch can be abandoned.
+'''
+
+def greedy_colouring(nbrs, candidates):
+    '''Colour the candidates greedily, taking them in increasing order
+    within each colour class. Return the list of pairs (node, colour),
+    in nondecreasing order of colour. Colours start at 1.
+
+    >>> nbrs = Neighbourhoods(graph_mask([0, 1, 1, 0, 1, 0, 0, 0]), 8)
+    >>> greedy_colouring(nbrs, to_mask([1, 2, 3, 4]))
+    [(1, 1), (2, 1), (4, 1), (3, 2)]
+    '''
+    order = []
+    colour = 0
+    uncoloured = candidates
+    while uncoloured:
+        colour += 1
+        available = uncoloured
+        while available:
+            low = available & -available
+            x = low.bit_length() - 1
+            order.append((x, colour))
+            uncoloured ^= low
+            available &= ~(nbrs[x] | low)
+    return order
+
+def clique_exists_colour(graph, k, candidates):
+    if anchor:
+        return clique_exists_anchored_bits(clique_exists_colour_helper, graph, k, candidates)
+    start_memo()
+    nbrs = Neighbourhoods(graph_mask(graph), len(graph))
+    return clique_exists_colour_helper(nbrs, k, to_mask(candidates))
+
+def clique_exists_colour_helper(nbrs, k, candidates):
+    global cnt
+    cnt += 1
+    if stats.enabled:
+        stats.reached(k)
+
+    if not quiet:
+        print_progress(k, to_nodes(candidates))
+
+    remaining = popcount(candidates)
+    if remaining < k:
+        if stats.enabled:
+            stats.prune('few_candidates')
+        return False
+
+    if k <= 1:
+        return True
+
+    '''The degree filter and the check for exactly k candidates of the
+    bitset engine are kept, as they are cheaper than the colouring and
+    already settle most searches.'''
+    candidates = filter_bits(nbrs, k, candidates, remaining)
+    if not candidates:
+        if stats.enabled:
+            stats.prune('degree')
+        return False
+
+    remaining = popcount(candidates)
+    if remaining == k:
+        if stats.enabled:
+            stats.prune('exactly_k')
+        return is_clique_bits(nbrs, candidates)
+
+    order = greedy_colouring(nbrs, candidates)
+
+    for x, colour in reversed(order):
+        if colour < k:
+            if stats.enabled:
+                stats.prune('colour')
+            return False
+
+        new_candidates = nbrs[x] & candidates
+        if memo is None:
+            found = clique_exists_colour_helper(nbrs, k-1, new_candidates)
+        else:
+            found = memoized(clique_exists_colour_helper, nbrs, k-1, new_candidates)
+        if found:
+            return True
+
+        candidates ^= 1 << x
+
+    return False
+
+
+'''== Translation symmetry breaking ==
+
+In both is_spectral and is_tile, we look for a k-clique C among the
+neighbours of node 0, so that C together with 0 is a (k+1)-clique K.
+For every x in K, the translate of K by x is again a (k+1)-clique
+containing 0. So every clique is found, or refuted, once for each of
+its elements used as the anchor 0.
+
+To break this symmetry, let d be the smallest of the differences
+x ^ y over distinct x, y in K, attained by x and y, say. The translate
+of K by x contains 0 and d, and all its differences are the same as
+those of K. So if there is a k-clique at all, then there is one, C,
+such that all differences of C together with 0 are at least the
+smallest element c of C. We only search for such cliques.
+
+If anchor is True, then all engines do the following at the top level,
+unless k is so small that the engine handles it directly. For each
+candidate c in increasing order, they remove from the graph all the
+nodes that are less than c, that is, they only keep the differences
+that are at least c, and search for a (k-1)-clique among the remaining
+candidates greater than c that are adjacent to c. The removed nodes
+make all these searches much smaller. Since the graph changes with c,
+the transposition table is restarted for each c.
+'''
+anchor = False
+
+def clique_exists_list(graph, k, candidates):
+    '''The 'list' engine: clique_exists_helper, with the anchor rule
+    above if anchor is True.'''
+    if anchor:
+        return clique_exists_anchored(graph, k, candidates)
+    return clique_exists_helper(graph, k, candidates)
+
+def clique_exists_anchored(graph, k, candidates):
+    global cnt
+    if k <= 2:
+        return clique_exists_helper(graph, k, candidates)
+
+    cnt += 1
+
+    if not quiet:
+        print_progress(k, candidates)
+
+    if len(candidates) < k:
+        return False
+
+    '''The degree filter and the check for exactly k candidates of
+    clique_exists_helper are done before anchoring, as they settle
+    most searches at once.'''
+    candidates = filter_list(graph, k, candidates)
+    if candidates is None:
+        return False
+
+    if len(candidates) == k:
+        return all(graph[x ^ y] for x in candidates for y in candidates if y > x)
+
+    candidates = sorted(candidates)
+    for i, c in enumerate(candidates):
+        if len(candidates) - i < k:
+            return False
+        restricted = [0] * c + graph[c:]
+        new_candidates = [x for x in candidates[i+1:] if restricted[x ^ c]]
+        if len(new_candidates) >= k-1 and \
+           clique_exists_helper(restricted, k-1, new_candidates):
+            return True
+
+    return False
+
+def filter_list(graph, k, candidates):
+    '''The degree filter of clique_exists_helper. Return the candidates
+    that are adjacent to at least k-1 other candidates, or None as soon
+    as it is clear that fewer than k of them are left.'''
+    new_candidates = []
+    remaining = len(candidates)
+    for x in candidates:
+        deg = 0
+        for y in candidates:
+            deg += graph[x ^ y]
+        if deg >= k-1:
+            new_candidates.append(x)
+        else:
+            remaining -= 1
+            if remaining < k:
+                return None
+    return new_candidates
+
+def clique_exists_anchored_bits(helper, graph, k, candidates):
+    '''The same as clique_exists_anchored for the bitset engines,
+    where helper is the recursive function of the engine.'''
+    global cnt
+    if k <= 3:
+        start_memo()
+        nbrs = Neighbourhoods(graph_mask(graph), len(graph))
+        return helper(nbrs, k, to_mask(candidates))
+
+    cnt += 1
+
+    if not quiet:
+        print_progress(k, candidates)
+
+    remaining = len(candidates)
+    if remaining < k:
+        return False
+
+    mask = graph_mask(graph)
+    N = len(graph)
+    nbrs = Neighbourhoods(mask, N)
+    candidates = filter_bits(nbrs, k, to_mask(candidates), remaining)
+    if not candidates:
+        return False
+
+    remaining = popcount(candidates)
+    if remaining == k:
+        return is_clique_bits(nbrs, candidates)
+
+    rest = candidates
+    while rest:
+        low = rest & -rest
+        rest ^= low
+        '''The bitset -low has exactly the bits from that of c upwards set.'''
+        nbrs = Neighbourhoods(mask & -low, N)
+        new_candidates = nbrs[low.bit_length() - 1] & rest
+        if popcount(new_candidates) >= k-1:
+            start_memo()
+            if helper(nbrs, k-1, new_candidates):
+                return True
+
+        remaining -= 1
+        if remaining < k:
             return False
 
     return False
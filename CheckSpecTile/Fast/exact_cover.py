@@ -0,0 +1,91 @@
+'''This is a new file for this fast version of the program.
+
+It provides a second way of checking whether a subset E of Z_2^d
+is a tile, used by is_tile in spectral_tile.py if tile_engine is
+set to 'exact_cover' there.
+
+E is a tile if and only if some of its translates partition Z_2^d.
+This is an exact cover problem: the items to cover are the N elements
+of Z_2^d, and the options are the translates of E. We solve it by
+Knuth's Algorithm X, always covering next the element that lies in
+the fewest remaining translates.
+
+Instead of dancing links, the columns and rows are kept in a dictionary
+of sets and a dictionary of lists, respectively, which is the usual
+way of implementing Algorithm X in Python and is faster than linked
+lists of Python objects.
+
+Since a translate of a tiling is again a tiling, we may assume that
+the tiling contains E itself, so E is selected before the search
+begins. This plays the same role as looking only for cliques that
+contain node 0 in is_tile.
+
+The variable cnt counts the recursions, like clique.cnt.
+'''
+
+cnt = 0
+
+def tile_exists(E, N):
+    '''
+    >>> tile_exists([0, 1, 2, 3], 16)
+    True
+    >>> tile_exists([0, 1, 2, 4], 8)
+    True
+    >>> tile_exists([0, 1, 2, 4, 8, 15], 16)
+    False
+    '''
+    if N % len(E) != 0:
+        return False
+
+    # rows[t] is the translate of E by t.
+    rows = {}
+    seen = set()
+    for t in range(N):
+        row = sorted(x ^ t for x in E)
+        key = tuple(row)
+        if key not in seen:
+            seen.add(key)
+            rows[t] = row
+
+    # columns[x] is the set of t such that x is in rows[t].
+    columns = {x: set() for x in range(N)}
+    for t, row in rows.items():
+        for x in row:
+            columns[x].add(t)
+
+    select(columns, rows, 0)
+    return algorithm_x(columns, rows)
+
+def algorithm_x(columns, rows):
+    global cnt
+    cnt += 1
+
+    if not columns:
+        return True
+
+    x = min(columns, key=lambda x: len(columns[x]))
+    for t in list(columns[x]):
+        removed = select(columns, rows, t)
+        if algorithm_x(columns, rows):
+            return True
+        deselect(columns, rows, t, removed)
+
+    return False
+
+def select(columns, rows, t):
+    removed = []
+    for x in rows[t]:
+        for u in columns[x]:
+            for y in rows[u]:
+                if y != x:
+                    columns[y].remove(u)
+        removed.append(columns.pop(x))
+    return removed
+
+def deselect(columns, rows, t, removed):
+    for x in reversed(rows[t]):
+        columns[x] = removed.pop()
+        for u in columns[x]:
+            for y in rows[u]:
+                if y != x:
+                    columns[y].add(u)
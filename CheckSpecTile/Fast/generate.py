@@ -30,6 +30,13 @@ set and a tile are invariant under a permutation of
 coordinates, so this strategy does not affect the
 correctness of the program.
 
+The dimension d is that of a context of prelim.py, which the
+functions below take as their argument context, by default the
+default context, as is_spectral does. The lists of elements of Z_2^d
+that they use, such as ok_as_fst, are kept for each dimension in a
+Tables object, which get_tables builds when it is first asked for, so
+importing this file reads nothing from the command line.
+
 
 == Effectiveness ==
 
@@ -49,6 +56,10 @@ perform a perfect detection. (Obviously we cannot get
 a reduction by a factor of more than 6! = 720. But the
 actual reduction factor may or may not be close to this.)
 
+(Update: the exact check below, with exact=True, performs a perfect
+detection, which leaves 13,136,081 subsets, a reduction by a factor
+of 685.)
+
 Notice that performing a perfect detection may be
 computationally expensive. So even if we were to implement
 a perfect detection, it would need to tested to see
@@ -58,7 +69,45 @@ if it actually helps reduce runtime.
 == How to use ==
 
 The function generate_sets_reduced is used in main_all.py
-to enumerate subsets as explained above.
+to enumerate subsets as explained above. For n < d+4, main_all.py
+uses the function naive_generator instead, which enumerates all
+subsets containing the fixed elements.
+
+With order='revolving', generate_sets_reduced enumerates the same
+subsets, but for each choice of the first three elements, the rest
+of the elements are enumerated in revolving-door order, so that
+consecutive subsets differ by exactly one element. This is used with
+the incremental evaluator in the file incremental.py.
+
+The function generate_sets_tagged enumerates the same subsets as
+generate_sets_reduced, and also tells for which of them it is
+already known that they are not tiles. This is used by main_all.py
+with the option --tile-prune.
+
+The subsets of naive_generator and generate_sets_reduced (in
+lexicographic order) can be ranked and unranked, that is, the
+position of a subset in the enumeration can be found from the subset
+and vice versa, by naive_rank, naive_unrank, reduced_rank, and
+reduced_unrank. With the argument start, both generators begin at
+the subset at that position, without going through the ones before
+it. This is used by main_all.py with the options --start and --stop.
+
+The function generate_sets_canonical enumerates exactly one subset
+in each orbit under a larger group, of order (d+1)!, that also
+contains affine maps moving 0 (see the file canonical.py). It is
+used by main_all.py with the option --canonical. For d = 6 it
+enumerates the following numbers of subsets.
+
+    n    generate_sets_reduced    generate_sets_canonical
+   12                   52604                       1709
+   13                  599311                      10792
+   14                 5599410                      65788
+   15                43933582                     372834
+   16               295137078                    1923722
+
+The orbits are found by orderly generation, which is slower per
+subset than the heuristics below, but for these sizes it takes
+a small fraction of the time needed to check the subsets.
 
 Input
 size: The size n of subsets of Z_2^d that we want to enumerate.
@@ -69,7 +118,8 @@ which enumerates subsets of size 16 in Z_2^6.
 
 For checking Fuglede's conjecture for subsets of size 16
 in Z_2^6, the function generate_sets_reduced accounts for
-about 2.5% of the total runtime.
+about 1% of the total runtime for the first 60,000 subsets,
+as measured with main_all.py --stats (see the file stats.py).
 
 
 == Implemented heuristics ==
@@ -107,7 +157,7 @@ smaller than the original fst. Hence, after permuting
 the coordinates, we obtain a subset that comes before E
 in the ordering.
 
-This is implemented in the list ok_as_fst.
+This is implemented in the list ok_as_fst of the Tables below.
 
 
 === The second element ===
@@ -197,49 +247,102 @@ x must satisfy the following.
    smaller than thd.
    
 This is implemented in the function ok_as_rest.
+
+
+=== Exact check ===
+
+With exact=True, generate_sets_reduced also checks each subset with
+is_canonical from the file canonical.py, which decides exactly whether
+some permutation of coordinates gives a subset that comes before it.
+Such a permutation must send the first element to the first element,
+the second to the second, and so on. So the check only tries
+permutations that do so, within the classes of coordinates on which
+the elements matched so far agree, which get smaller with each
+element.
+
+In lexicographic order, the check is applied as each element is
+added, not only to whole subsets, since a subset whose first k elements
+come after some image of them does too (see the file canonical.py).
+
+For d = 6, this gives the following numbers of subsets, and the
+extra time per subset of generate_sets_reduced.
+
+    n    without exact    with exact    time with exact
+   12            52604          9358     9.8 us per subset
+   13           599311         65705     5.2 us per subset
+   14          5599410        426155     3.9 us per subset
+   15         43933582       2499151     4.1 us per subset
+   16        295137078      13136081     3.6 us per subset
+
+The time is the time of generate_sets_reduced with exact=True divided
+by the number of subsets it enumerates without it, which takes about
+0.5 us per subset.
 '''
 
-import sys
+import prelim
 if __name__ == "__main__":
-    sys.argv.extend([6])
+    prelim.set_dimension(6)
     test_mode = True
 else:
     test_mode = False
 
 from itertools import combinations
+from bisect import bisect_right
+from math import comb
 
-from prelim import dim, N, fixed_elts
+from canonical import is_canonical, simplex_cells, coordinate_cells
 
 # Transform an integer to the corresponding element of Z_2^d.
-def int_to_bits(x):
+def int_to_bits(x, context=None):
     '''
     >>> int_to_bits(18)
     (0, 1, 0, 0, 1, 0)'''
+    dim = (context or prelim.default_context()).dim
     return tuple(int(c) for c in format(x, '0'+str(dim)+'b'))
 
-# Transform an element of Z_2^d to the corresponding integer.
-bits_to_int = {}
+class Tables:
+    '''The lists of the elements of Z_2^d used by the functions below,
+    for the dimension of a context of prelim.py.'''
 
-for x in range(N):
-    bits_to_int[int_to_bits(x)]= x
+    def __init__(self, context):
+        self.context = context
+        N, fixed_elts = context.N, context.fixed_elts
 
-def _():
-    '''
-    >>> bits_to_int[(1,0,1,1,0,0)]
-    44'''
+        # Transform an element of Z_2^d to the corresponding integer.
+        self.bits_to_int = {}
+        for x in range(N):
+            self.bits_to_int[int_to_bits(x, context)] = x
 
-pool = [int_to_bits(x) for x in range(N) if x not in fixed_elts]
+        self.pool = [int_to_bits(x, context) for x in range(N) if x not in fixed_elts]
 
-ok_as_fst = list(map(int_to_bits, [pow(2,i)-1 for i in range(2, dim+1)]))
+        self.ok_as_fst = [int_to_bits(pow(2,i)-1, context)
+                          for i in range(2, context.dim+1)]
 
-def __():
-    '''
-    >>> ok_as_fst[0] == (0,0,0,0,1,1)
+        self.naive_pool = [x for x in range(N) if x not in fixed_elts]
+
+        # prefix_tables[size] is the pair of lists of
+        # generate_prefixes(size) and of the positions of the first
+        # subset of each prefix in generate_sets_reduced(size).
+        self.prefix_tables = {}
+
+# tables[dim] is get_tables(context) for a context of dimension dim.
+tables = {}
+
+def get_tables(context=None):
+    '''Return the Tables of context, by default the default context.
+
+    >>> get_tables().bits_to_int[(1,0,1,1,0,0)]
+    44
+    >>> get_tables().ok_as_fst[0] == (0,0,0,0,1,1)
     True
-    >>> ok_as_fst[-1] == (1,1,1,1,1,1)
+    >>> get_tables().ok_as_fst[-1] == (1,1,1,1,1,1)
     True'''
-    
-def ok_as_snd(fst):
+    context = context or prelim.default_context()
+    if context.dim not in tables:
+        tables[context.dim] = Tables(context)
+    return tables[context.dim]
+
+def ok_as_snd(fst, context=None):
     '''
     >>> (0,0,0,0,1,1) in ok_as_snd((0,0,0,1,1,1))
     False
@@ -251,6 +354,9 @@ def ok_as_snd(fst):
     True
     >>> (0,1,1,1,1,1) in ok_as_snd((0,0,0,1,1,1))
     True'''
+    tables = get_tables(context)
+    dim = tables.context.dim
+
     def ok(snd):
         if snd <= fst:
             return False
@@ -261,9 +367,9 @@ def ok_as_snd(fst):
                 return False
         return True
     
-    return [snd for snd in pool if ok(snd)]
+    return [snd for snd in tables.pool if ok(snd)]
 
-def ok_as_thd(fst, snd):
+def ok_as_thd(fst, snd, context=None):
     '''
     >>> (0,0,0,1,1,1) in ok_as_thd((0,0,0,0,1,1),(0,0,1,1,0,0))
     False
@@ -282,6 +388,8 @@ def ok_as_thd(fst, snd):
     >>> (1,1,1,0,0,0) in ok_as_thd((0,0,0,1,1,1),(0,1,1,1,1,1))
     True
     '''
+    tables = get_tables(context)
+    dim = tables.context.dim
     fst1 = fst.index(1)
     
     def ok(thd):
@@ -296,9 +404,9 @@ def ok_as_thd(fst, snd):
                 return False
         return True
     
-    return [x for x in pool if ok(x)]
+    return [x for x in tables.pool if ok(x)]
 
-def ok_as_rest(fst, snd, thd):
+def ok_as_rest(fst, snd, thd, context=None):
     '''
     >>> (0,1,1,1,1,1) in ok_as_rest((0,0,0,0,1,1),(0,0,1,1,0,0),(1,1,0,0,0,0))
     False
@@ -319,6 +427,7 @@ def ok_as_rest(fst, snd, thd):
     >>> (1,1,1,1,0,0) in ok_as_rest((0,0,0,0,1,1),(0,1,1,1,0,0),(1,0,1,1,0,0))
     True
     '''
+    tables = get_tables(context)
     fst1 = fst.index(1)
     snd1 = snd.index(1)
     
@@ -333,31 +442,341 @@ def ok_as_rest(fst, snd, thd):
             return False
         return True
     
-    return [x for x in pool if ok(x)]
-
-def generate_sets_reduced(size):
-    cnt = 0
-
-    for fst in ok_as_fst:
-        for snd in ok_as_snd(fst):
-            for thd in ok_as_thd(fst, snd):
+    return [x for x in tables.pool if ok(x)]
+
+def naive_generator(size, start=0, context=None):
+    '''With start > 0, the first start subsets are skipped, without
+    enumerating them.'''
+    tables = get_tables(context)
+    naive_pool, fixed_elts = tables.naive_pool, tables.context.fixed_elts
+    if start > 0:
+        combs = combinations_from(naive_pool, size-len(fixed_elts), start)
+    else:
+        combs = combinations(naive_pool, size-len(fixed_elts))
+
+    for comb in combs:
+        yield list(comb)
+
+def rank_combination(indices, m):
+    '''Return the position of the combination with the given sorted
+    indices in the lexicographic order of the combinations of range(m)
+    of the same size, counting from 0.
+
+    >>> rank_combination([0, 2, 3], 5)
+    3
+    '''
+    r = len(indices)
+    rank = 0
+    x = 0
+    for i, index in enumerate(indices):
+        for y in range(x, index):
+            rank += comb(m - y - 1, r - i - 1)
+        x = index + 1
+    return rank
+
+def unrank_combination(rank, m, r):
+    '''Return the sorted indices of the combination of r elements of
+    range(m) at position rank in the lexicographic order.
+
+    >>> unrank_combination(3, 5, 3)
+    [0, 2, 3]
+    '''
+    indices = []
+    x = 0
+    for i in range(r):
+        while comb(m - x - 1, r - i - 1) <= rank:
+            rank -= comb(m - x - 1, r - i - 1)
+            x += 1
+        indices.append(x)
+        x += 1
+    return indices
+
+def combinations_from(pool, r, start):
+    '''Enumerate the r-combinations of pool in the same order as
+    itertools.combinations, beginning with the one at position start.
+
+    >>> list(combinations_from([1, 2, 3, 4], 2, 3))
+    [(2, 3), (2, 4), (3, 4)]
+    '''
+    m = len(pool)
+    if start >= comb(m, r):
+        return
+    indices = unrank_combination(start, m, r)
+    while True:
+        yield tuple(pool[i] for i in indices)
+        for i in reversed(range(r)):
+            if indices[i] < m - r + i:
+                break
+        else:
+            return
+        indices[i] += 1
+        for j in range(i+1, r):
+            indices[j] = indices[j-1] + 1
+
+def naive_rank(comb, context=None):
+    '''Return the position of comb among the subsets of naive_generator,
+    counting from 0.'''
+    naive_pool = get_tables(context).naive_pool
+    return rank_combination([naive_pool.index(x) for x in comb], len(naive_pool))
+
+def naive_unrank(rank, size, context=None):
+    '''Return the subset of naive_generator(size) at position rank.'''
+    tables = get_tables(context)
+    naive_pool = tables.naive_pool
+    indices = unrank_combination(rank, len(naive_pool),
+                                 size-len(tables.context.fixed_elts))
+    return [naive_pool[i] for i in indices]
+
+def revolving_door(pool, r):
+    '''Enumerate the r-combinations of pool in revolving-door order,
+    by Algorithm R of Knuth, The Art of Computer Programming, Vol. 4A,
+    Section 7.2.1.3. Each combination is a tuple in the same order as
+    pool, and consecutive combinations differ by exactly one element.
+
+    >>> list(revolving_door([1, 2, 3, 4], 2))
+    [(1, 2), (2, 3), (1, 3), (3, 4), (2, 4), (1, 4)]
+    '''
+    n = len(pool)
+    if r == 0:
+        yield ()
+        return
+    if r > n:
+        return
+    # c[1..r] as in Algorithm R, with c[r+1] = n as a sentinel.
+    c = [None] + list(range(r)) + [n]
+    while True:
+        yield tuple(pool[c[j]] for j in range(1, r+1))
+        if r % 2 == 1:
+            if c[1] + 1 < c[2]:
+                c[1] += 1
+                continue
+            j = 2
+            step = 4
+        else:
+            if c[1] > 0:
+                c[1] -= 1
+                continue
+            j = 2
+            step = 5
+        while True:
+            if j > r:
+                return
+            if step == 4:
+                if c[j] >= j:
+                    c[j] = c[j-1]
+                    c[j-1] = j - 2
+                    break
+                j += 1
+                step = 5
+            else:
+                if c[j] + 1 < c[j+1]:
+                    c[j-1] = c[j]
+                    c[j] += 1
+                    break
+                j += 1
+                step = 4
+
+def generate_prefixes(size, context=None):
+    '''Yield the pairs (first3, new_pool) of generate_sets_reduced:
+    the first three elements fst, snd, thd, and the list of elements
+    that may follow them.'''
+    tables = get_tables(context)
+    bits_to_int = tables.bits_to_int
+    for fst in tables.ok_as_fst:
+        for snd in ok_as_snd(fst, context):
+            for thd in ok_as_thd(fst, snd, context):
                 first3 = [bits_to_int[x] for x in [fst, snd, thd]]
-                new_pool = [bits_to_int[x] for x in ok_as_rest(fst, snd, thd)]
-                new_size = size-len(fixed_elts)-3
-                for comb in combinations(new_pool, new_size):
-                    cnt += 1
-                    if test_mode:
-                        if cnt % 10000000 == 0:
-                            print('\ncnt =', cnt)
-                            item = first3 + list(comb)
-                            print('item =', item)
-                    else:
-                        item = first3 + list(comb)
-                        yield item
+                new_pool = [bits_to_int[x] for x in ok_as_rest(fst, snd, thd, context)]
+                yield first3, new_pool
+
+def prefix_table(size, context=None):
+    tables = get_tables(context)
+    prefix_tables = tables.prefix_tables
+    if size not in prefix_tables:
+        prefixes = list(generate_prefixes(size, context))
+        offsets = [0]
+        r = size - len(tables.context.fixed_elts) - 3
+        for first3, new_pool in prefixes:
+            offsets.append(offsets[-1] + comb(len(new_pool), r))
+        prefix_tables[size] = prefixes, offsets
+    return prefix_tables[size]
+
+def reduced_rank(item, context=None):
+    '''Return the position of item among the subsets of
+    generate_sets_reduced(size), counting from 0.'''
+    fixed_elts = (context or prelim.default_context()).fixed_elts
+    size = len(fixed_elts) + len(item)
+    prefixes, offsets = prefix_table(size, context)
+    first3, rest = item[:3], item[3:]
+    for i, (prefix_first3, new_pool) in enumerate(prefixes):
+        if prefix_first3 == first3:
+            indices = [new_pool.index(x) for x in rest]
+            return offsets[i] + rank_combination(indices, len(new_pool))
+    raise ValueError('{} is not enumerated by generate_sets_reduced'.format(item))
+
+def reduced_unrank(rank, size, context=None):
+    '''Return the subset of generate_sets_reduced(size) at position rank.
+
+    >>> item = reduced_unrank(123456789, 16)
+    >>> reduced_rank(item)
+    123456789
+    '''
+    fixed_elts = (context or prelim.default_context()).fixed_elts
+    prefixes, offsets = prefix_table(size, context)
+    i = bisect_right(offsets, rank) - 1
+    first3, new_pool = prefixes[i]
+    indices = unrank_combination(rank - offsets[i], len(new_pool), size-len(fixed_elts)-3)
+    return first3 + [new_pool[j] for j in indices]
+
+def generate_sets_reduced(size, order='lex', exact=False, start=0, context=None):
+    '''With exact=True, only the subsets that are the smallest among all
+    their images under permutations of coordinates are enumerated, so
+    that there is exactly one subset in each orbit. See the section
+    "Exact check" above.
+
+    With start > 0, the first start subsets are skipped, without
+    enumerating them, by reduced_unrank. This is only possible with
+    order='lex' and exact=False.'''
+    context = context or prelim.default_context()
+    cells = coordinate_cells(context)
+    cnt = 0
+    new_size = size-len(context.fixed_elts)-3
+
+    if start > 0:
+        if order != 'lex' or exact:
+            raise ValueError('start is only possible with order=\'lex\' and exact=False')
+        prefixes, offsets = prefix_table(size, context)
+        first = bisect_right(offsets, start) - 1
+        prefixes = prefixes[first:]
+    else:
+        prefixes = generate_prefixes(size, context)
+
+    for first3, new_pool in prefixes:
+        if exact and not is_canonical(first3, cells):
+            continue
+        if start > 0:
+            combs = combinations_from(new_pool, new_size, start - offsets[first])
+            start = 0
+        elif order == 'revolving':
+            combs = revolving_door(new_pool, new_size)
+            if exact:
+                combs = (comb for comb in combs
+                         if is_canonical(first3 + list(comb), cells))
+        elif exact:
+            combs = canonical_combinations(new_pool, new_size, first3, context)
+        else:
+            combs = combinations(new_pool, new_size)
+        for comb in combs:
+            cnt += 1
+            if test_mode:
+                if cnt % 10000000 == 0:
+                    print('\ncnt =', cnt)
+                    item = first3 + list(comb)
+                    print('item =', item)
+            else:
+                item = first3 + list(comb)
+                yield item
 
     if test_mode:
         print('\ncnt =', cnt)
 
+def canonical_combinations(pool, r, prefix, context=None):
+    '''Yield the r-combinations comb of pool in lexicographic order
+    for which prefix + comb is smallest among its images under
+    permutations of coordinates. The elements of pool must be larger
+    than those of prefix.
+
+    A combination is only extended if prefix + comb is already
+    smallest, which is enough by the file canonical.py.
+    '''
+    if r == 0:
+        yield ()
+        return
+
+    cells = coordinate_cells(context)
+    for i in range(len(pool) - r + 1):
+        first = pool[i]
+        if is_canonical(prefix + [first], cells):
+            for comb in canonical_combinations(pool[i+1:], r-1, prefix + [first], context):
+                yield (first,) + comb
+
+def generate_sets_tagged(size, may_be_tile, depth=1, context=None):
+    '''Enumerate the same subsets as generate_sets_reduced, in the same
+    order, as pairs (item, tile_known_false).
+
+    may_be_tile(P) must return False only if no subset of size n that
+    contains P is a tile. It is evaluated for the fixed elements
+    together with fst, then with fst and snd, then with fst, snd and
+    thd, and then with the first 1, ..., depth elements of the rest.
+    Once it returns False, all subsets below are yielded with
+    tile_known_false True, without evaluating it again.
+
+    See the function may_be_tile in spectral_tile.py for why this
+    works for tiles.
+    '''
+    fixed_elts = (context or prelim.default_context()).fixed_elts
+    new_size = size-len(fixed_elts)-3
+    known = {}
+
+    def known_false(P):
+        key = tuple(P)
+        if key not in known:
+            known[key] = not may_be_tile(P)
+        return known[key]
+
+    for first3, new_pool in generate_prefixes(size, context):
+        prefix = fixed_elts + first3
+        if known_false(prefix[:-2]) or known_false(prefix[:-1]) \
+           or known_false(prefix):
+            for comb in combinations(new_pool, new_size):
+                yield first3 + list(comb), True
+        else:
+            for comb, tile_known_false in \
+                tagged_combinations(new_pool, new_size, prefix, may_be_tile, depth):
+                yield first3 + list(comb), tile_known_false
+
+def tagged_combinations(pool, r, prefix, may_be_tile, depth):
+    '''Yield the pairs (comb, tile_known_false) for the r-combinations
+    comb of pool in lexicographic order, evaluating may_be_tile on
+    prefix together with the first 1, ..., depth elements of comb.'''
+    if depth == 0 or r == 0:
+        for comb in combinations(pool, r):
+            yield comb, False
+        return
+
+    for i in range(len(pool) - r + 1):
+        first = pool[i]
+        if not may_be_tile(prefix + [first]):
+            for comb in combinations(pool[i+1:], r-1):
+                yield (first,) + comb, True
+        else:
+            for comb, tile_known_false in \
+                tagged_combinations(pool[i+1:], r-1, prefix + [first], may_be_tile, depth-1):
+                yield (first,) + comb, tile_known_false
+
+def generate_sets_canonical(size, context=None):
+    '''Enumerate one subset in each orbit of the subsets of size n that
+    contain the fixed elements, under all affine maps that permute the
+    fixed elements, by orderly generation. See the file canonical.py.
+
+    Unlike the other generators, this works for every n >= d+1.
+    '''
+    context = context or prelim.default_context()
+    cells = simplex_cells(context)
+    pool = get_tables(context).naive_pool
+    r = size - len(context.fixed_elts)
+
+    def extend(R, start):
+        if len(R) == r:
+            yield R
+            return
+        for i in range(start, len(pool) - (r - len(R)) + 1):
+            S = R + [pool[i]]
+            if is_canonical(S, cells):
+                yield from extend(S, i+1)
+
+    yield from extend([], 0)
+
 if test_mode:
     print('Begin testing...\n')
     
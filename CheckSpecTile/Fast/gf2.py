@@ -0,0 +1,129 @@
+'''This is a new file for this fast version of the program.
+
+It computes the linear structure of a subset E of Z_2^d, seen as a
+vector space over GF(2): its span, its stabilizer, that is, the
+subgroup H of all t with E ^ t == E, and its decomposition into
+cosets of H. The function decided_by_cosets uses this structure to
+settle that E is both a spectral set and a tile without any clique
+search. It is used by is_spectral and is_tile in spectral_tile.py
+as the prefilter rule 'few_cosets'.
+
+Why the structure decides the answers:
+
+E is a union of m cosets of its stabilizer H, that is, E = T ^ H for
+a set T of m coset representatives. If T + H is a tile or a spectral
+set in the quotient Z_2^d / H, then so is E in Z_2^d: a tiling
+complement of T lifts to one of E, and a spectrum of T in the
+annihilator of H, together with representatives of the characters
+modulo that annihilator, is a spectrum of E.
+
+m = 1: E is a coset of H, that is, an affine subspace. It is tiled
+       by the cosets of H, and the annihilator of H is a spectrum.
+m = 2: This cannot happen, since then E itself is a coset of a
+       subgroup twice as large as H, which would then stabilize E.
+m = 3: E has odd size, so it is neither (see the prefilter).
+m = 4: For the same reason as for m = 2, the four cosets are
+       H, H ^ a, H ^ b, H ^ c with a, b, c linearly independent
+       modulo H. So T is a copy of {0, e1, e2, e3} in a subgroup
+       of dimension 3, which tiles it with its complement
+       {e1^e2, e1^e3, e2^e3, e1^e2^e3} = T ^ (e1^e2^e3), and is
+       therefore spectral there too.
+
+So E is both a spectral set and a tile if m is 1 or 4. For larger m
+the structure only reduces the question to the smaller set T, which
+is still left to the clique search.
+
+The span bounds m: if m is 1 or 4, then the span of the differences
+E[0] ^ x for x in E has dimension at most log2(n) + 1. This is checked
+first, since it is cheaper than finding the stabilizer. In particular,
+a set that contains the fixed elements of prelim.py, as in main_all.py,
+is only settled if n >= N/2.
+'''
+
+def span_basis(E):
+    '''Return a basis of the span of E over GF(2), in reduced form:
+    the highest bits of the basis elements are distinct, and each
+    of them is set in exactly one basis element.
+
+    >>> span_basis([3, 5, 6])
+    [5, 3]
+    >>> span_basis([1, 2, 4, 7])
+    [4, 2, 1]
+    '''
+    basis = []
+    for x in E:
+        for b in basis:
+            x = min(x, x ^ b)
+        if x:
+            for i in range(len(basis)):
+                basis[i] = min(basis[i], basis[i] ^ x)
+            basis.append(x)
+            basis.sort(reverse=True)
+    return basis
+
+def rank(E, bound=None):
+    '''Return the dimension of the span of E, or bound + 1 as soon as
+    it is seen to be larger than bound, if bound is given.
+
+    >>> rank([0, 3, 5, 6])
+    2
+    >>> rank([1, 2, 4, 8, 16], bound=2)
+    3
+    '''
+    basis = {}
+    for x in E:
+        while x:
+            top = x.bit_length()
+            if top not in basis:
+                basis[top] = x
+                if bound is not None and len(basis) > bound:
+                    return len(basis)
+                break
+            x ^= basis[top]
+    return len(basis)
+
+def stabilizer(E):
+    '''Return the sorted list of elements t of Z_2^d with E ^ t == E.
+
+    Such a t maps E[0] into E, so it is one of the E[0] ^ x for x in E.
+
+    >>> stabilizer([0, 1, 2, 3, 4, 5, 6, 7])
+    [0, 1, 2, 3, 4, 5, 6, 7]
+    >>> stabilizer([0, 1, 4, 5, 8, 9])
+    [0, 1]
+    >>> stabilizer([0, 1, 2, 4])
+    [0]
+    '''
+    if len(E) == 0:
+        return [0]
+    Eset = set(E)
+    return sorted(t for t in (E[0] ^ x for x in E)
+                  if all(x ^ t in Eset for x in E))
+
+def coset_representatives(E, H):
+    '''Return the sorted list of the smallest elements of the cosets
+    of the subgroup H that make up E, where H is the stabilizer of E.
+
+    >>> coset_representatives([0, 1, 4, 5, 8, 9], [0, 1])
+    [0, 4, 8]
+    '''
+    return sorted(x for x in E if all(x <= x ^ t for t in H))
+
+def decided_by_cosets(E):
+    '''Return True if the coset structure of E shows that it is both
+    a spectral set and a tile, and None otherwise.
+
+    >>> decided_by_cosets([1, 3, 5, 7])
+    True
+    >>> decided_by_cosets([0, 1, 2, 4, 8, 9, 10, 12])
+    True
+    >>> decided_by_cosets([0, 1, 2, 4, 8, 16, 32, 3]) is None
+    True
+    '''
+    n = len(E)
+    if n == 0 or rank([E[0] ^ x for x in E], n.bit_length()) > n.bit_length():
+        return None
+    h = len(stabilizer(E))
+    if n // h in (1, 4):
+        return True
+    return None
@@ -0,0 +1,116 @@
+'''This is a new file for this fast version of the program.
+
+It provides the class IncrementalEvaluator, which checks whether
+the sets enumerated by generate_sets_reduced are spectral sets and
+tiles, as is_spectral and is_tile do, but reuses the work done for
+the previous set.
+
+generate_sets_reduced enumerates sets that consist of a prefix, made
+of the fixed elements and the first three elements fst, snd, thd, and
+a tail. Consecutive sets usually have the same prefix and tails that
+differ in only a few elements. With order='revolving', consecutive
+tails differ in exactly one element.
+
+The evaluator keeps the following for the current set E.
+
+1. The column sums of eval_matrix over the rows in E, that is, the
+   numbers computed in the loop of is_spectral. Adding or removing
+   an element x of E adds or subtracts row x of eval_matrix, which
+   takes N additions instead of N*9 for the whole loop.
+
+2. For each y in Z_2^d, the number of pairs of elements of E whose
+   difference is y. The translate by y overlaps with E if and only
+   if this number is positive. Adding or removing x changes the
+   numbers for the differences x ^ z with z in E, which takes |E|
+   operations instead of |E|*(|E|-1)/2 for the whole difference set.
+
+When the prefix changes, both are recomputed from the prefix, and
+the tail is then added element by element.
+
+An evaluator checks the sets of the dimension of the context of
+prelim.py it is given, by default the default context.
+'''
+
+import prelim
+import spectral_tile
+from spectral_tile import spectral_search, tile_search, not_spectral_by_size, not_tile_by_size
+
+class IncrementalEvaluator:
+    '''Usage: call move_to(E) for each set E, then is_spectral() and
+    is_tile() for the answers for E. The first prefix_length elements
+    of E are the prefix, and the rest are the tail, by default the
+    fixed elements and fst, snd, thd.'''
+
+    def __init__(self, prefix_length=None, context=None):
+        self.context = context or prelim.default_context()
+        if prefix_length is None:
+            prefix_length = self.context.dim + 4
+        self.prefix_length = prefix_length
+        self.prefix = None
+
+    def move_to(self, E):
+        prefix = E[:self.prefix_length]
+        if prefix != self.prefix:
+            self.start_prefix(prefix)
+
+        new_tail = set(E[self.prefix_length:])
+        for x in self.tail - new_tail:
+            self.remove(x)
+        for x in new_tail - self.tail:
+            self.add(x)
+        self.tail = new_tail
+        self.E = E
+
+    def start_prefix(self, prefix):
+        self.prefix = prefix
+        self.tail = set()
+        self.elements = []
+        dim, N = self.context.dim, self.context.N
+        fixed_elts = self.context.fixed_elts
+
+        if prefix[:dim+1] == fixed_elts:
+            self.sums = list(self.context.sum_rows_fixed_elts)
+            self.elements = list(fixed_elts)
+            self.multiplicities = [0] * N
+            for i in range(dim+1):
+                for j in range(i+1, dim+1):
+                    self.multiplicities[fixed_elts[i] ^ fixed_elts[j]] += 1
+            rest = prefix[dim+1:]
+        else:
+            self.sums = [0] * N
+            self.multiplicities = [0] * N
+            rest = prefix
+
+        for x in rest:
+            self.add(x)
+
+    def add(self, x):
+        self.sums = [s + r for s, r in zip(self.sums, self.context.eval_matrix[x])]
+        multiplicities = self.multiplicities
+        for y in self.elements:
+            multiplicities[x ^ y] += 1
+        self.elements.append(x)
+
+    def remove(self, x):
+        self.elements.remove(x)
+        multiplicities = self.multiplicities
+        for y in self.elements:
+            multiplicities[x ^ y] -= 1
+        self.sums = [s - r for s, r in zip(self.sums, self.context.eval_matrix[x])]
+
+    def is_spectral(self):
+        n = len(self.E)
+        if not_spectral_by_size(n):
+            return False
+        is_ortho_to_0 = [0 if s else 1 for s in self.sums]
+        return spectral_search(is_ortho_to_0, n)
+
+    def is_tile(self):
+        n = len(self.E)
+        if not_tile_by_size(n, context=self.context):
+            return False
+        if spectral_tile.tile_engine != 'clique':
+            return spectral_tile.is_tile(self.E, self.context)
+        is_nonoverlap_with_0 = [0 if m else 1 for m in self.multiplicities]
+        is_nonoverlap_with_0[0] = 0
+        return tile_search(is_nonoverlap_with_0, n)
@@ -0,0 +1,73 @@
+'''This is a new file for this fast version of the program.
+
+It provides NumPy kernels that do the setup of is_spectral and is_tile
+for a whole batch of sets at once. They are used by the functions
+is_spectral_many and is_tile_many in spectral_tile.py.
+
+A batch is a B x n array of integers (or a list of B lists of
+length n), each row of which is a subset of Z_2^d of size n.
+
+NumPy is only needed by this file, so the rest of the program runs
+without it.
+
+The functions take N = 2^d, so that they work for any dimension.
+'''
+
+import numpy as np
+
+def indicators(batch, N):
+    '''Return the B x N array whose row b is the indicator function
+    of the set in row b of the batch.
+
+    >>> indicators([[0, 3], [1, 2]], 8)[:, :4]
+    array([[1, 0, 0, 1],
+           [0, 1, 1, 0]], dtype=int32)
+    '''
+    batch = np.asarray(batch, dtype=np.intp)
+    B = len(batch)
+    result = np.zeros((B, N), dtype=np.int32)
+    result[np.arange(B)[:, None], batch] = 1
+    return result
+
+def walsh_hadamard(a):
+    '''Return the Walsh-Hadamard transform of each row of the B x N
+    array a, computed by the fast transform for all rows at once.
+
+    Row b of the result is the product of eval_matrix with row b of a.
+    That is, its entry i is the sum of a[b][x] * eval_matrix[i][x]
+    over all x. This is the same as what is_spectral computes,
+    because eval_matrix is symmetric.
+    '''
+    B, N = a.shape
+    h = 1
+    while h < N:
+        a = a.reshape(B, N // (2*h), 2, h)
+        x = a[:, :, 0, :]
+        y = a[:, :, 1, :]
+        a = np.stack((x + y, x - y), axis=2)
+        h *= 2
+    return a.reshape(B, N)
+
+def ortho_masks(batch, N):
+    '''Return the B x N array of 0s and 1s whose row b is the list
+    is_ortho_to_0 computed by is_spectral for the set in row b.'''
+    return (walsh_hadamard(indicators(batch, N)) == 0).astype(np.int8)
+
+def nonoverlap_masks(batch, N):
+    '''Return the B x N array of 0s and 1s whose row b is the list
+    is_nonoverlap_with_0 computed by is_tile for the set in row b.
+
+    The differences x ^ y of all pairs of elements of all sets are
+    computed at once as a B x n x n array, and the translates by these
+    differences are marked as overlapping. The diagonal x ^ x = 0
+    marks the translate by 0, as in is_tile.
+
+    >>> nonoverlap_masks([[0, 1, 2, 3]], 64)[:, :8]
+    array([[0, 0, 0, 0, 1, 1, 1, 1]], dtype=int8)
+    '''
+    batch = np.asarray(batch, dtype=np.intp)
+    B = len(batch)
+    differences = (batch[:, :, None] ^ batch[:, None, :]).reshape(B, -1)
+    result = np.ones((B, N), dtype=np.int8)
+    result[np.arange(B)[:, None], differences] = 0
+    return result
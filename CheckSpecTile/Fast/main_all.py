@@ -13,20 +13,183 @@ some subsets that are enumerated.
 If n < d+4, then the mentioned function does not apply,
 and we resort to naive enumeration. But there are not
 very many subsets in this case anyway.
+
+The arguments are the dimension d, the size n, and optionally
+the number of subsets after which to stop, followed by any of
+the options below.
+
+At the end, the number of subsets settled by each rule of the
+prefilter of the file spectral_tile.py is printed. A subset that the
+size rules settle for both properties, as every subset of odd size,
+is not evaluated at all.
+
+--incremental
+    Use the incremental evaluator of the file incremental.py
+    instead of calling is_spectral and is_tile on each subset.
+
+--order revolving
+    Enumerate the subsets in revolving-door order (see the file
+    generate.py). This is best used with --incremental.
+
+--tile-prune DEPTH
+    Enumerate the subsets with generate_sets_tagged (see the file
+    generate.py), which finds whole ranges of subsets that cannot
+    be tiles by looking at their first elements, up to DEPTH
+    elements after fst, snd, and thd. is_tile is skipped for these
+    subsets, and the number of skipped checks is printed at the end.
+    This does not work with --exact or --order revolving.
+
+--cache SIZE
+    Cache the results of up to SIZE clique searches (see the file
+    spectral_tile.py). The hit rate is printed at the end. With
+    --workers, each worker has its own cache, and their counts are
+    added up.
+
+--exact
+    Enumerate with generate_sets_reduced(size, order, exact=True),
+    which enumerates exactly one subset in each orbit under
+    permutations of coordinates (see the file generate.py).
+
+--canonical
+    Enumerate one subset in each orbit under all affine maps that
+    permute the fixed elements, a group of order (d+1)! instead of
+    the d! permutations of coordinates, with generate_sets_canonical
+    (see the files generate.py and canonical.py). This works for
+    every n, and --order and --tile-prune are then ignored.
+
+--workers N
+    Check the sets in N worker processes (see the file runner.py).
+    This is only used for sets enumerated by generate_sets_reduced,
+    without --canonical, --tile-prune, or a limit. The order of the
+    checks is then not fixed, but the results are the same. This does
+    not work with --order revolving.
+
+--shard I/N
+    Check only the I-th of N parts of the sets of generate_sets_reduced,
+    for I = 1, ..., N, and write the results to a JSON file, by default
+    shard_<d>_<n>_<I>of<N>.json, or the file given by --output FILE.
+    The parts have about the same numbers of sets and only depend on
+    d, n, N, and --exact, so they can be run on different machines
+    and then put together with the script merge.py (see the file
+    runner.py). This can be combined with --workers, and has the same
+    restrictions.
+
+--start S, --stop T
+    Check only the subsets with case numbers S+1, ..., T, that is,
+    skip the first S subsets and stop after the T-th. The first
+    S subsets are skipped without enumerating them (see the functions
+    naive_generator and generate_sets_reduced of the file generate.py),
+    so slices from anywhere in the enumeration can be checked, for
+    example for profiling. This only works for naive_generator and
+    generate_sets_reduced in lexicographic order without --exact.
+
+--checkpoint FILE
+    Every 600 seconds, or every SECONDS with --checkpoint-interval
+    SECONDS, and at the end, save the number of subsets checked so
+    far, which is their position in the enumeration, and the results
+    so far to FILE. The file is replaced atomically, so it is always
+    complete (see write_json_atomically in the file runner.py). This
+    works in the same cases as --start, and not with --workers.
+
+--resume
+    Continue the run saved in the file given by --checkpoint, from the
+    subset after the last one it had checked, using the same options.
+    The subsets before it are skipped as with --start.
+
+--bitmap FILE
+    Write the answers for every subset, 2 bits each, to FILE at the
+    position given by its rank, that is, its case number minus 1, so
+    that they can be looked up later with the script query.py (see the
+    file bitmap.py). This needs NumPy, and works in the same cases as
+    --start, and with --workers and --shard without --exact. FILE may
+    already have the answers for other ranges of ranks.
+
+--store FILE
+    Look up the answers for each subset in the SQLite database FILE
+    before checking it, and add the new answers to it (see the file
+    store.py). This does not work with --incremental, and not with
+    --workers, like --checkpoint.
+
+--stats FILE
+    Collect statistics on the time spent in each phase of the run and
+    on the clique searches, for the whole run and for each prefix, and
+    write them to FILE as JSON at exit (see the file stats.py).
+
+--table-cache DIR
+    Save the table of prelim.py for d in the directory DIR, or load it
+    from there if it was saved before (see the file prelim.py).
 '''
 
 import sys
-from itertools import combinations
 
-from prelim import dim, N, fixed_elts
+def pop_flag(name):
+    '''Remove the option name from the command line, and return
+    whether it was there.'''
+    if name in sys.argv:
+        sys.argv.remove(name)
+        return True
+    return False
+
+def pop_option(name, default=None):
+    '''Remove the option name and the value following it from the
+    command line, and return the value, or default if the option
+    was not there.'''
+    if name in sys.argv:
+        i = sys.argv.index(name)
+        value = sys.argv[i+1]
+        del sys.argv[i:i+2]
+        return value
+    return default
+
+'''The options must be removed before prelim.py reads the dimension.'''
+use_incremental = pop_flag('--incremental')
+order = pop_option('--order', 'lex')
+cache_size = int(pop_option('--cache', 0))
+tile_prune = pop_option('--tile-prune')
+canonical = pop_flag('--canonical')
+exact = pop_flag('--exact')
+workers = pop_option('--workers')
+if workers is not None:
+    workers = int(workers)
+shard = pop_option('--shard')
+start = int(pop_option('--start', 0))
+stop = pop_option('--stop')
+if stop is not None:
+    stop = int(stop)
+output = pop_option('--output')
+checkpoint = pop_option('--checkpoint')
+checkpoint_interval = float(pop_option('--checkpoint-interval', 600))
+resume = pop_flag('--resume')
+bitmap = pop_option('--bitmap')
+store = pop_option('--store')
+stats_file = pop_option('--stats')
+table_cache = pop_option('--table-cache')
+
+import prelim
+prelim.cache_dir = table_cache
+context = prelim.default_context()
+dim, N, fixed_elts = context.dim, context.N, context.fixed_elts
 import spectral_tile
-from spectral_tile import is_spectral, is_tile
 import clique
 
-from generate import generate_sets_reduced
+from generate import naive_generator, generate_sets_reduced, generate_sets_tagged
+from generate import generate_sets_canonical
+from incremental import IncrementalEvaluator
+import runner
+from runner import write_json_atomically
+from runner import Results, check_set, print_counterexample, work_units, run_parallel
+from runner import run_unit, shard_units, shard_ranges, shard_record
+import json
+import time
+import stats
 
 spectral_tile.quiet = True
 clique.quiet = True
+spectral_tile.cache_size = cache_size
+runner.use_incremental = use_incremental
+runner.exact = exact
+if stats_file is not None:
+    stats.enable(stats_file)
 
 if len(sys.argv) > 2:
     size = int(sys.argv[2])
@@ -38,54 +201,181 @@ if len(sys.argv) > 3:
 else:
     limit = None
 
-ans = {}
-for x in [True, False]:
-    for y in [True, False]:
-        ans[(x, y)] = 0
-
 counter_found = False
-cnt = 0
-
-def naive_generator(size):
-    pool = [x for x in range(N) if x not in fixed_elts]
-    
-    for comb in combinations(pool, size-len(fixed_elts)):
-        yield list(comb)
-        
-if size - len(fixed_elts) < 3:
-    generator = naive_generator(size)
+tagged = False
+results = Results()
+
+if store is not None:
+    if use_incremental:
+        sys.exit('--store does not work with --incremental, '
+                 'since the evaluator does not call is_spectral and is_tile.')
+    from store import ResultStore
+    spectral_tile.result_store = ResultStore(store)
+
+if tile_prune is not None and exact and not canonical:
+    sys.exit('--tile-prune does not work with --exact, since generate_sets_tagged '
+             'enumerates the same subsets as generate_sets_reduced without it.')
+
+if tile_prune is not None and order != 'lex' and not canonical:
+    sys.exit('--tile-prune does not work with --order, since generate_sets_tagged '
+             'enumerates the subsets in lexicographic order.')
+
+if (workers is not None or shard is not None) and order != 'lex' and not canonical:
+    sys.exit('--workers and --shard do not work with --order, since the work units '
+             'enumerate the subsets in lexicographic order.')
+
+if bitmap is not None:
+    if canonical or tile_prune is not None or exact or order != 'lex':
+        sys.exit('--bitmap only works with generate_sets_reduced '
+                 'in lexicographic order without --exact, or with naive_generator.')
+    from bitmap import ResultBitmap
+    result_bitmap = ResultBitmap(bitmap, size)
+    runner.record_codes = True
+
+if (workers is not None or shard is not None) and size - len(fixed_elts) >= 3 \
+   and not canonical and tile_prune is None and limit is None \
+   and start == 0 and stop is None and checkpoint is None and store is None:
+    if shard is not None:
+        shard_index, shards = map(int, shard.split('/'))
+        all_units = shard_units(size, shards)
+        start, stop = shard_ranges(all_units, shards)[shard_index - 1]
+        units = work_units(size, workers or 1, all_units[start:stop])
+    else:
+        units = work_units(size, workers or 1)
+
+    if workers is not None:
+        print('Checking {} units of work with {} workers'.format(len(units), workers))
+        unit_results_list = run_parallel(units, workers)
+    else:
+        print('Checking {} units of work'.format(len(units)))
+        unit_results_list = map(run_unit, units)
+
+    for i, unit_results in enumerate(unit_results_list):
+        results.merge(unit_results)
+        if unit_results.stats is not None:
+            stats.add(unit_results.stats)
+        if bitmap is not None:
+            result_bitmap.write(unit_results.first_rank, unit_results.codes)
+        for counterexample in unit_results.counterexamples:
+            print_counterexample(*counterexample)
+            counter_found = True
+        if (i+1) % 100 == 0:
+            print('\nFinished {} of {} units, {} cases'.format(i+1, len(units), results.cnt))
+    results.restore_counters()
+    if bitmap is not None:
+        result_bitmap.sync()
 else:
-    generator = generate_sets_reduced(size)
-    
-for comb in generator:
-    cnt += 1
-
-    if limit is not None and cnt > limit:
-        print('\nStopping at case {}'.format(limit))
-        break
-
-    E = fixed_elts + comb
-    
-    if cnt % 10000 == 0:
-        print('\nChecking case {}'.format(cnt))
-        print('E = {}'.format(E))
-    
-    spec_ans = is_spectral(E)
-    tile_ans = is_tile(E)
-    ans[(spec_ans, tile_ans)] += 1
-
-    if spec_ans != tile_ans:
-        print('\nCounterexample found:')
-        print(' '.join(format(x, '0'+str(dim)+'b') for x in E))
-        if spec_ans:
-            print('\nIt IS a spectral set.')
-        else:
-            print('\nIt IS NOT a spectral set.')
-        if tile_ans:
-            print('It IS a tile.')
+    if workers is not None or shard is not None:
+        print('Not using workers or shards, since they only work with')
+        print('generate_sets_reduced and without --canonical, --tile-prune,')
+        print('or a limit, --start, --stop, --checkpoint, or --store.')
+        shard = None
+
+    if (start > 0 or checkpoint is not None) \
+       and (canonical or tile_prune is not None or exact or order != 'lex'):
+        sys.exit('--start and --checkpoint only work with generate_sets_reduced '
+                 'in lexicographic order without --exact, or with naive_generator.')
+
+    '''The options that determine which subsets are checked. A run can
+    only be resumed with the same ones.'''
+    settings = {'dim': dim, 'size': size, 'start': start, 'stop': stop, 'limit': limit}
+    position = start
+
+    if resume:
+        if checkpoint is None:
+            sys.exit('--resume needs --checkpoint FILE.')
+        with open(checkpoint) as f:
+            saved = json.load(f)
+        if saved['settings'] != settings:
+            sys.exit('The run in {} has the options {}, not {}.'
+                     .format(checkpoint, saved['settings'], settings))
+        results = Results.from_json(saved['results'])
+        counter_found = bool(results.counterexamples)
+        position = saved['case']
+        results.restore_counters()
+        print('Resuming after case {}'.format(position))
+
+    '''The codes of the subsets checked since the last write to the
+    bitmap, that is, of the last len(codes) subsets.'''
+    codes = bytearray() if bitmap is not None else None
+
+    def write_codes():
+        result_bitmap.write(start + results.cnt - len(codes), codes)
+        codes.clear()
+
+    def save_checkpoint(finished):
+        if store is not None:
+            spectral_tile.result_store.flush()
+        if bitmap is not None:
+            write_codes()
+            result_bitmap.sync()
+        results.save_counters()
+        write_json_atomically(checkpoint, {
+            'settings': settings,
+            'case': start + results.cnt,
+            'finished': finished,
+            'results': results.to_json(),
+        })
+
+    next_checkpoint = time.monotonic() + checkpoint_interval
+
+    if canonical:
+        generator = generate_sets_canonical(size)
+        evaluator = IncrementalEvaluator(min(size, dim+4))
+    elif size - len(fixed_elts) < 3:
+        generator = naive_generator(size, position)
+        evaluator = IncrementalEvaluator(len(fixed_elts))
+    elif tile_prune is not None:
+        may_be_tile = lambda P: spectral_tile.may_be_tile(P, size)
+        generator = generate_sets_tagged(size, may_be_tile, int(tile_prune))
+        evaluator = IncrementalEvaluator()
+        tagged = True
+    else:
+        generator = generate_sets_reduced(size, order, exact, position)
+        evaluator = IncrementalEvaluator()
+    if stats.enabled:
+        generator = stats.timed_iter(generator)
+
+    for comb in generator:
+        if tagged:
+            comb, tile_known_false = comb
         else:
-            print('It IS NOT a tile.')
-        counter_found = True
+            tile_known_false = False
+
+        case = start + results.cnt + 1
+
+        if limit is not None and results.cnt >= limit:
+            print('\nStopping at case {}'.format(case - 1))
+            break
+        if stop is not None and case > stop:
+            print('\nStopping at case {}'.format(stop))
+            break
+
+        E = fixed_elts + comb
+
+        if case % 10000 == 0:
+            print('\nChecking case {}'.format(case))
+            print('E = {}'.format(E))
+
+        if check_set(E, results, evaluator, tile_known_false, codes):
+            print_counterexample(*results.counterexamples[-1])
+            counter_found = True
+
+        if checkpoint is not None and results.cnt % 1000 == 0 \
+           and time.monotonic() >= next_checkpoint:
+            save_checkpoint(False)
+            next_checkpoint = time.monotonic() + checkpoint_interval
+
+        if bitmap is not None and len(codes) >= 1 << 16:
+            write_codes()
+
+    if checkpoint is not None:
+        save_checkpoint(True)
+    elif bitmap is not None:
+        write_codes()
+        result_bitmap.sync()
+
+ans = results.ans
 
 print('\nResults')
 print('IS  spectral & IS  Tile:', ans[(True, True)])
@@ -93,7 +383,26 @@ print('IS  spectral & NOT Tile:', ans[(True, False)])
 print('NOT spectral & IS  Tile:', ans[(False, True)])
 print('NOT spectral & NOT Tile:', ans[(False, False)])
 
-if limit is None:
+if tagged:
+    print('\nSkipped tile checks:', results.skipped_tile_checks)
+
+if cache_size > 0:
+    print('\n' + spectral_tile.cache_report())
+
+print('\n' + spectral_tile.prefilter_report())
+
+if store is not None:
+    spectral_tile.result_store.close()
+    print('\n' + spectral_tile.result_store.report())
+
+if shard is not None:
+    if output is None:
+        output = 'shard_{}_{}_{}of{}.json'.format(dim, size, shard_index, shards)
+    record = shard_record(size, shard_index, shards, all_units, start, stop, results)
+    write_json_atomically(output, record)
+    print('\nShard {} of {} written to {}'.format(shard_index, shards, output))
+    print('Use merge.py on all shards for the verdict.')
+elif limit is None and start == 0 and stop is None:
     print(('\nFuglede\'s conjecture is {} for sets of size {} in Z_2^{}' +
            '\nwhich do not lie in any hyperplane') \
           .format(str(not counter_found).upper(), size, dim))
@@ -1,7 +1,33 @@
-'''There is no significant change to this file.'''
+'''This file has been changed in the following way.
 
-from prelim import dim, N, fixed_elts
+With the option --store FILE after the dimension, the answers are
+looked up in the SQLite database FILE, and new answers are added to
+it (see the file store.py). So a set that was checked before, by this
+script or by main_all.py with --store FILE, or an image of such a set
+under a permutation of coordinates, is answered at once.
+
+The tables of the dimension are the Context of the file prelim.py,
+which is passed to is_spectral and is_tile.
+'''
+
+import sys
+
+store = None
+if '--store' in sys.argv:
+    i = sys.argv.index('--store')
+    store = sys.argv[i+1]
+    del sys.argv[i:i+2]
+
+import prelim
 from spectral_tile import is_spectral, is_tile
+import spectral_tile
+
+context = prelim.default_context()
+dim, N, fixed_elts = context.dim, context.N, context.fixed_elts
+
+if store is not None:
+    from store import ResultStore
+    spectral_tile.result_store = ResultStore(store, batch_size=1)
 
 def parse_input(inp):
     return [int(x, base=2) for x in inp.split()]
@@ -28,15 +54,18 @@ while True:
     
     print('It has size {}.'.format(len(E)))
 
+    if store is not None and spectral_tile.result_store.lookup(E, 'spectral') is not None:
+        print('\nE, or an image of it, was checked before.')
+
     print('\nChecking whether E is a spectral set...')
-    spec_ans = is_spectral(E)
+    spec_ans = is_spectral(E, context)
     if spec_ans:
         print('\nE IS a spectral set.')
     else:
         print('\nE IS NOT a spectral set.')
     
     print('\nChecking whether E is a tile...')
-    tile_ans = is_tile(E)
+    tile_ans = is_tile(E, context)
     if tile_ans:
         print('\nE IS a tile.')
     else:
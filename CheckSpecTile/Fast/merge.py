@@ -0,0 +1,102 @@
+'''This is a new file for this fast version of the program.
+
+It puts together the results of a run of main_all.py that was split
+into shards with the option --shard I/N. The arguments are the JSON
+files written by the shards, for example
+
+python merge.py shard_6_16_*of64.json
+
+Before printing the results, it checks that the files are intact,
+by their checksums, that they belong to the same run, and that their
+ranges of units cover all units of the run exactly once. Without
+--exact, it also checks that each shard checked as many sets as its
+units contain. If a check fails, it prints why and does not print
+a verdict.
+
+See the file runner.py for how the shards are made.
+'''
+
+import sys
+import json
+
+files = sys.argv[1:]
+records = []
+for name in files:
+    with open(name) as f:
+        records.append(json.load(f))
+
+if not records:
+    sys.exit('No shard files given.')
+
+import prelim
+prelim.set_dimension(records[0]['dim'])
+
+import runner
+from runner import checksum, shard_units, unit_size
+
+def fail(message):
+    print(message)
+    sys.exit('\nThe shards do not make up a complete run. No verdict.')
+
+for name, record in zip(files, records):
+    if checksum(record) != record['checksum']:
+        fail('{}: the checksum does not match.'.format(name))
+
+first = records[0]
+for name, record in zip(files, records):
+    for key in ['dim', 'size', 'exact', 'shards', 'total_units']:
+        if record[key] != first[key]:
+            fail('{}: {} is {}, but {} in {}.'.format(
+                name, key, record[key], first[key], files[0]))
+
+dim, size, shards = first['dim'], first['size'], first['shards']
+runner.exact = first['exact']
+units = shard_units(size, shards)
+if len(units) != first['total_units']:
+    fail('The shards have {} units, but this version of the program makes {}.'
+         .format(first['total_units'], len(units)))
+
+'''Check that the ranges cover range(len(units)) exactly once.'''
+ranges = sorted((start, stop, name) for name, record in zip(files, records)
+                for start, stop in record['ranges'])
+position = 0
+for start, stop, name in ranges:
+    if start > position:
+        fail('Units {} to {} are not covered.'.format(position, start - 1))
+    if start < position:
+        fail('{}: units {} to {} are covered twice.'
+             .format(name, start, min(stop, position) - 1))
+    position = stop
+if position < len(units):
+    fail('Units {} to {} are not covered.'.format(position, len(units) - 1))
+
+if not first['exact']:
+    for name, record in zip(files, records):
+        expected = sum(unit_size(unit) for start, stop in record['ranges']
+                       for unit in units[start:stop])
+        if record['cases'] != expected:
+            fail('{}: {} sets were checked, but its units have {}.'
+                 .format(name, record['cases'], expected))
+
+ans = {(True, True): 0, (True, False): 0, (False, True): 0, (False, False): 0}
+cases = 0
+counterexamples = []
+for record in records:
+    for x, y, count in record['ans']:
+        ans[(x, y)] += count
+    cases += record['cases']
+    counterexamples += record['counterexamples']
+
+for E, spec_ans, tile_ans in counterexamples:
+    runner.print_counterexample(E, spec_ans, tile_ans)
+
+print('\nMerged {} shards of {} with {} cases'.format(len(records), shards, cases))
+print('\nResults')
+print('IS  spectral & IS  Tile:', ans[(True, True)])
+print('IS  spectral & NOT Tile:', ans[(True, False)])
+print('NOT spectral & IS  Tile:', ans[(False, True)])
+print('NOT spectral & NOT Tile:', ans[(False, False)])
+
+print(('\nFuglede\'s conjecture is {} for sets of size {} in Z_2^{}' +
+       '\nwhich do not lie in any hyperplane') \
+      .format(str(not counterexamples).upper(), size, dim))
@@ -0,0 +1,169 @@
+'''This is a new file for this fast version of the program.
+
+It counts, without enumerating them, the orbits of the subsets of size
+n of Z_2^d that contain the fixed elements, under two groups: the d!
+permutations of coordinates, which generate_sets_reduced uses, and the
+(d+1)! affine maps that permute the fixed elements, which
+generate_sets_canonical uses (see the file canonical.py). It compares
+them with the numbers of subsets that generate_sets_reduced
+enumerates, which it computes from the sizes of the pools of the
+prefixes with math.comb.
+
+The arguments are the dimension d and optionally the sizes n,
+for example
+
+python orbits.py 6 12 13 14 15 16
+
+Without sizes, all sizes from d+4 to N/2 are shown. The columns are
+the number of all subsets, the number enumerated by main_all.py, the
+two numbers of orbits, and the ratios of the second number to them.
+A ratio of 1 means that every orbit is enumerated exactly once. This
+takes less than a second for d = 6 and d = 7.
+
+
+== Counting orbits ==
+
+A subset of size n containing the fixed elements is the same as
+a subset of size r = n-d-1 of the other N-d-1 elements, which the
+groups permute among themselves. By Burnside's lemma, the number of
+orbits is the average over the group of the number of subsets fixed
+by each map. A subset is fixed by a map if and only if it is a union
+of cycles of the map, so this number is the coefficient of t^r in
+the product of 1 + t^L over the cycles of the map, of lengths L.
+
+This only depends on the cycle lengths of the map on the elements,
+and these only depend on the cycle type of the permutation of
+coordinates, or of points p_0 = 0, p_1 = e_1, ..., p_d = e_d, that
+it comes from. So it suffices to go through the partitions of d, or
+of d+1, with one permutation of each cycle type, and to weight them
+by the number of permutations of that cycle type.
+'''
+
+import sys
+
+sizes = [int(x) for x in sys.argv[2:]]
+del sys.argv[2:]
+
+from math import comb, factorial
+
+from prelim import dim, N, fixed_elts
+from generate import generate_prefixes
+from canonical import to_points, apply_map
+
+def partitions(m, largest=None):
+    '''Yield the partitions of m into parts of size at most largest,
+    as lists of parts in nonincreasing order.
+
+    >>> list(partitions(4))
+    [[4], [3, 1], [2, 2], [2, 1, 1], [1, 1, 1, 1]]
+    '''
+    if largest is None:
+        largest = m
+    if m == 0:
+        yield []
+        return
+    for part in range(min(m, largest), 0, -1):
+        for rest in partitions(m - part, part):
+            yield [part] + rest
+
+def class_size(partition):
+    '''Return the number of permutations with the given cycle type.
+
+    >>> class_size([2, 1, 1])
+    6
+    '''
+    size = factorial(sum(partition))
+    for part in set(partition):
+        multiplicity = partition.count(part)
+        size //= pow(part, multiplicity) * factorial(multiplicity)
+    return size
+
+def permutation_of_type(partition, points):
+    '''Return a permutation of the list points with the given cycle
+    type, as a list perm with perm[p] the image of p.'''
+    perm = [None] * (dim+1)
+    i = 0
+    for part in partition:
+        cycle = points[i:i+part]
+        for j in range(part):
+            perm[cycle[j]] = cycle[(j+1) % part]
+        i += part
+    return perm
+
+def cycle_lengths(perm):
+    '''Return the lengths of the cycles of the map on the non-fixed
+    elements that comes from the permutation perm of points.'''
+    image = {}
+    for x in range(N):
+        image[x] = apply_map(perm, to_points(x)) >> 1
+
+    lengths = []
+    seen = set(fixed_elts)
+    for x in range(N):
+        if x in seen:
+            continue
+        length = 0
+        while x not in seen:
+            seen.add(x)
+            x = image[x]
+            length += 1
+        lengths.append(length)
+    return lengths
+
+def fixed_subsets(lengths):
+    '''Return the list whose entry r is the number of subsets of size r
+    that are unions of cycles with the given lengths, that is, the
+    coefficients of the product of 1 + t^L.
+
+    >>> fixed_subsets([1, 2])
+    [1, 1, 1, 1]
+    '''
+    coefficients = [1] + [0] * sum(lengths)
+    for length in lengths:
+        for r in range(len(coefficients) - 1, length - 1, -1):
+            coefficients[r] += coefficients[r - length]
+    return coefficients
+
+def orbit_counts(points):
+    '''Return the list whose entry r is the number of orbits of the
+    subsets of size r of the non-fixed elements, under the maps coming
+    from the permutations of the given points.'''
+    total = [0] * (N - len(fixed_elts) + 1)
+    for partition in partitions(len(points)):
+        perm = permutation_of_type(partition, points)
+        for i in range(dim+1):
+            if perm[i] is None:
+                perm[i] = i
+        weight = class_size(partition)
+        for r, count in enumerate(fixed_subsets(cycle_lengths(perm))):
+            total[r] += weight * count
+    order = factorial(len(points))
+    return [count // order for count in total]
+
+def reduced_counts():
+    '''Return the list whose entry r is the number of subsets with r
+    non-fixed elements that main_all.py enumerates: all of them for
+    r < 3, and those of generate_sets_reduced otherwise.'''
+    pool_sizes = [len(new_pool) for first3, new_pool in generate_prefixes(dim+4)]
+    return [comb(N - len(fixed_elts), r) if r < 3 else
+            sum(comb(m, r-3) for m in pool_sizes)
+            for r in range(N - len(fixed_elts) + 1)]
+
+if __name__ == '__main__':
+    coordinate_orbits = orbit_counts(list(range(1, dim+1)))
+    simplex_orbits = orbit_counts(list(range(dim+1)))
+    reduced = reduced_counts()
+
+    if not sizes:
+        sizes = range(dim+4, N//2 + 1)
+
+    print('Subsets of Z_2^{} containing the fixed elements'.format(dim))
+    print('\n{:>4} {:>22} {:>22} {:>22} {:>8} {:>22} {:>8}'.format(
+        'n', 'all', 'reduced', 'coordinate orbits', 'excess',
+        'simplex orbits', 'excess'))
+    for n in sizes:
+        r = n - len(fixed_elts)
+        print('{:>4} {:>22} {:>22} {:>22} {:>8.2f} {:>22} {:>8.2f}'.format(
+            n, comb(N - len(fixed_elts), r), reduced[r],
+            coordinate_orbits[r], reduced[r] / coordinate_orbits[r],
+            simplex_orbits[r], reduced[r] / simplex_orbits[r]))
@@ -0,0 +1,111 @@
+'''This is a new file for this fast version of the program.
+
+It looks up the answers written by main_all.py with the option
+--bitmap FILE (see the file bitmap.py), for example
+
+python query.py bitmap_6_16.bin --spectral yes --tile no
+
+prints how many of the subsets in the file were checked and found
+to be spectral sets but not tiles, and the first 20 of them. The
+arguments are one or more such files for the same d and n, for
+example one for each shard of a run, followed by any of the options
+below. The ranges of ranks in the files must not overlap.
+
+--spectral yes|no, --tile yes|no
+    Only count the subsets that are, or are not, spectral sets, or
+    tiles. Without these options, all checked subsets are counted.
+
+--start S, --stop T
+    Only look at the subsets with case numbers S+1, ..., T, as for
+    main_all.py.
+
+--show K
+    Print the first K subsets found instead of 20, or all of them
+    with --show all.
+
+The file is read in chunks of 4 MB, and the codes of each chunk are
+compared with NumPy, so the whole file of 74 MB for n = 16 in Z_2^6 is
+read in about 2 seconds. Only the subsets that are printed are
+computed from their ranks, with reduced_unrank or naive_unrank.
+'''
+
+import sys
+
+def pop_option(name, default=None):
+    '''Remove the option name and the value following it from the
+    command line, and return the value, or default if the option
+    was not there.'''
+    if name in sys.argv:
+        i = sys.argv.index(name)
+        value = sys.argv[i+1]
+        del sys.argv[i:i+2]
+        return value
+    return default
+
+spectral = pop_option('--spectral')
+tile = pop_option('--tile')
+start = int(pop_option('--start', 0))
+stop = pop_option('--stop')
+show = pop_option('--show', '20')
+files = sys.argv[1:]
+
+if not files:
+    sys.exit('No bitmap files given.')
+
+import json
+
+headers = []
+for name in files:
+    with open(name + '.json') as f:
+        headers.append(json.load(f))
+
+import prelim
+prelim.set_dimension(headers[0]['dim'])
+
+import numpy as np
+
+from bitmap import unrank, merge_ranges, matching_ranks
+
+dim, size, total = headers[0]['dim'], headers[0]['size'], headers[0]['total']
+for name, header in zip(files, headers):
+    if (header['dim'], header['size']) != (dim, size):
+        sys.exit('{} has the subsets of size {} in Z_2^{}, but {} those of size {} in Z_2^{}.'
+                 .format(name, header['size'], header['dim'], files[0], size, dim))
+
+'''The files are read in the order of their ranks.'''
+files, headers = zip(*sorted(zip(files, headers),
+                             key=lambda item: min(item[1]['ranges'], default=[0])))
+
+all_ranges = [r for header in headers for r in header['ranges']]
+if sum(b - a for a, b in all_ranges) != sum(b - a for a, b in merge_ranges(all_ranges)):
+    sys.exit('The ranges of ranks of the files overlap.')
+
+stop = total if stop is None else min(int(stop), total)
+show = None if show == 'all' else int(show)
+
+mask = value = 0
+for bit, answer in [(1, spectral), (2, tile)]:
+    if answer is not None:
+        mask |= bit
+        if answer == 'yes':
+            value |= bit
+
+checked = found = 0
+shown = []
+for name, header in zip(files, headers):
+    data = np.memmap(name, dtype=np.uint8, mode='r')
+    ranges = [[max(a, start), min(b, stop)] for a, b in header['ranges']
+              if max(a, start) < min(b, stop)]
+    checked += sum(b - a for a, b in ranges)
+    for ranks in matching_ranks(data, ranges, mask, value):
+        found += len(ranks)
+        if show is None or len(shown) < show:
+            shown += ranks[:None if show is None else show - len(shown)].tolist()
+
+print('{} subsets of size {} in Z_2^{} were checked, of {}'.format(checked, size, dim, total))
+print('{} of them match'.format(found))
+
+for rank in sorted(shown):
+    E = unrank(rank, size)
+    print('\nCase {}:'.format(rank + 1))
+    print(' '.join(format(x, '0'+str(dim)+'b') for x in E))
@@ -0,0 +1,363 @@
+'''This is a new file for this fast version of the program.
+
+It checks the sets enumerated by main_all.py, either one after another,
+or in a pool of worker processes with the option --workers.
+
+The function check_set checks one set and records the answers in
+a Results object. The variable use_incremental below is set by
+main_all.py from its option of the same name.
+
+The functions below take the context of prelim.py of the sets as
+their argument context, by default the default context, which the
+worker processes inherit from main_all.py.
+
+
+== Worker processes ==
+
+generate_sets_reduced enumerates, for each prefix fst, snd, thd, all
+the combinations of the elements in its pool. These are independent
+of each other, so each prefix is a unit of work, given as a triple
+(prefix, pool, r): the sets are the fixed elements, then prefix,
+then r elements of pool.
+
+The numbers of sets of the prefixes vary widely, so work_units
+splits every unit with more than 1/split_factor of the average
+work per worker into the units with one more element in the prefix,
+and sorts the units from the largest to the smallest. The units are
+then handed to the workers one at a time, each worker taking the
+next unit when it is done with the previous one, so the work is
+balanced even though the sizes are only known approximately.
+
+The workers are started by fork, so they inherit the tables of
+prelim.py from the main process instead of computing them again.
+Each worker returns a Results object for each unit, and these are
+merged into the results of the whole run.
+
+
+== Shards ==
+
+With the option --shard i/n of main_all.py, a run is split into n
+shards that can be run on different machines, with no communication
+between them. The units of the prefixes fst, snd, thd are taken in the order of
+generate_prefixes and split as for workers, see shard_units, and
+shard_ranges cuts this list into n consecutive ranges with about the
+same numbers of sets. Shard i checks the i-th
+range and writes its results to a JSON file, see shard_record. The
+script merge.py checks that the shards of a run cover every prefix
+exactly once, and adds up their results.
+'''
+
+from math import comb
+from itertools import combinations
+import hashlib
+import json
+import multiprocessing
+import os
+
+import prelim
+import spectral_tile
+import stats
+from spectral_tile import is_spectral, is_tile
+from spectral_tile import not_spectral_by_size, not_tile_by_size
+from generate import generate_prefixes, canonical_combinations, reduced_rank
+from canonical import is_canonical, coordinate_cells
+from incremental import IncrementalEvaluator
+
+use_incremental = False
+
+'''With exact = True, the work units enumerate the same sets as
+generate_sets_reduced with exact=True.'''
+exact = False
+
+split_factor = 50
+
+'''The counters of the result cache of spectral_tile.py, which the
+results of the units carry back to main_all.py.'''
+cache_counters = ['cache_hits', 'cache_misses', 'cache_evictions']
+
+'''With record_codes = True, run_unit returns the codes of the sets
+for main_all.py --bitmap.'''
+record_codes = False
+
+class Results:
+    '''The numbers of sets with each pair of answers, the counterexamples
+    as triples (E, spec_ans, tile_ans), the number of sets checked, the
+    number of tile checks skipped with --tile-prune, the numbers of
+    sets settled by each rule of the prefilter of spectral_tile.py, and
+    the hits, misses and evictions of its result cache.
+
+    With record_codes = True, the results of a unit also have the codes
+    of its sets, in order, and the rank of its first set. If the
+    statistics of the file stats.py are enabled, the results of a unit
+    also have the statistics of its sets, which main_all.py adds to its
+    own with stats.add.'''
+
+    def __init__(self):
+        self.ans = {}
+        for x in [True, False]:
+            for y in [True, False]:
+                self.ans[(x, y)] = 0
+        self.counterexamples = []
+        self.cnt = 0
+        self.skipped_tile_checks = 0
+        self.prefilter_counts = dict.fromkeys(spectral_tile.prefilter_counts, 0)
+        self.cache_counts = dict.fromkeys(cache_counters, 0)
+        self.codes = None
+        self.first_rank = None
+        self.stats = None
+
+    def merge(self, other):
+        for key in self.ans:
+            self.ans[key] += other.ans[key]
+        self.counterexamples += other.counterexamples
+        self.cnt += other.cnt
+        self.skipped_tile_checks += other.skipped_tile_checks
+        for rule in self.prefilter_counts:
+            self.prefilter_counts[rule] += other.prefilter_counts[rule]
+        for counter in self.cache_counts:
+            self.cache_counts[counter] += other.cache_counts[counter]
+
+    def save_counters(self):
+        '''Copy the prefilter and cache counts of spectral_tile.py into
+        the results, when the sets were checked in this process.'''
+        self.prefilter_counts.update(spectral_tile.prefilter_counts)
+        for counter in cache_counters:
+            self.cache_counts[counter] = getattr(spectral_tile, counter)
+
+    def restore_counters(self):
+        '''Copy the prefilter and cache counts of the results back into
+        spectral_tile.py, for its reports.'''
+        spectral_tile.prefilter_counts.update(self.prefilter_counts)
+        for counter, count in self.cache_counts.items():
+            setattr(spectral_tile, counter, count)
+
+    def to_json(self):
+        '''Return the results as a dictionary that can be written as JSON.'''
+        return {
+            'cnt': self.cnt,
+            'ans': [[x, y, self.ans[(x, y)]] for (x, y) in self.ans],
+            'counterexamples': [[E, spec_ans, tile_ans]
+                                for E, spec_ans, tile_ans in self.counterexamples],
+            'skipped_tile_checks': self.skipped_tile_checks,
+            'prefilter_counts': self.prefilter_counts,
+            'cache_counts': self.cache_counts,
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        '''Return the results written by to_json.'''
+        results = cls()
+        results.cnt = data['cnt']
+        for x, y, count in data['ans']:
+            results.ans[(x, y)] = count
+        results.counterexamples = [tuple(c) for c in data['counterexamples']]
+        results.skipped_tile_checks = data['skipped_tile_checks']
+        results.prefilter_counts.update(data['prefilter_counts'])
+        results.cache_counts.update(data.get('cache_counts', {}))
+        return results
+
+def check_set(E, results, evaluator, tile_known_false=False, codes=None, context=None):
+    '''Check whether E is a spectral set and a tile, and record the
+    answers in results. If codes is a bytearray, also append the code
+    of the answers to it (see the file bitmap.py). Return whether E is
+    a counterexample.'''
+    context = context or prelim.default_context()
+    size = len(E)
+    results.cnt += 1
+    if stats.enabled:
+        fixed = len(context.fixed_elts)
+        stats.start_set(E[fixed:fixed+3])
+
+    '''The size rules of the prefilter are checked here first, so that
+    the incremental evaluator is not moved to sets that they settle.'''
+    spec_settled = not_spectral_by_size(size)
+    tile_settled = not_tile_by_size(size, context=context)
+
+    if use_incremental and not (spec_settled and tile_settled):
+        if stats.enabled:
+            since = stats.clock()
+            evaluator.move_to(E)
+            stats.add_time('incremental_setup', since)
+        else:
+            evaluator.move_to(E)
+
+    if spec_settled:
+        spec_ans = False
+    elif use_incremental:
+        spec_ans = evaluator.is_spectral()
+    else:
+        spec_ans = is_spectral(E, context)
+
+    if tile_settled:
+        tile_ans = False
+    elif tile_known_false:
+        tile_ans = False
+        results.skipped_tile_checks += 1
+    elif use_incremental:
+        tile_ans = evaluator.is_tile()
+    else:
+        tile_ans = is_tile(E, context)
+    results.ans[(spec_ans, tile_ans)] += 1
+    if codes is not None:
+        codes.append(spec_ans + 2 * tile_ans)
+
+    if spec_ans != tile_ans:
+        results.counterexamples.append((E, spec_ans, tile_ans))
+        return True
+    return False
+
+def print_counterexample(E, spec_ans, tile_ans, context=None):
+    dim = (context or prelim.default_context()).dim
+    print('\nCounterexample found:')
+    print(' '.join(format(x, '0'+str(dim)+'b') for x in E))
+    if spec_ans:
+        print('\nIt IS a spectral set.')
+    else:
+        print('\nIt IS NOT a spectral set.')
+    if tile_ans:
+        print('It IS a tile.')
+    else:
+        print('It IS NOT a tile.')
+
+def unit_size(unit):
+    prefix, pool, r = unit
+    return comb(len(pool), r)
+
+def split_unit(unit, context=None):
+    '''Split a unit into the units with one more element in the prefix.'''
+    prefix, pool, r = unit
+    cells = coordinate_cells(context)
+    for i in range(len(pool) - r + 1):
+        new_prefix = prefix + [pool[i]]
+        if not exact or is_canonical(new_prefix, cells):
+            yield new_prefix, pool[i+1:], r-1
+
+def split_units(units, limit, context=None):
+    '''Split every unit with more than limit sets, again and again,
+    keeping the order of the sets. Units without sets are left out.'''
+    result = []
+    for unit in units:
+        if unit_size(unit) == 0:
+            continue
+        if unit_size(unit) > limit and unit[2] > 0:
+            result += split_units(split_unit(unit, context), limit, context)
+        else:
+            result.append(unit)
+    return result
+
+def prefix_units(size, context=None):
+    '''Return the list of units of the prefixes fst, snd, thd, in the
+    order of generate_prefixes, for n >= d+4.'''
+    context = context or prelim.default_context()
+    cells = coordinate_cells(context)
+    r = size - len(context.fixed_elts) - 3
+    return [(first3, new_pool, r) for first3, new_pool in generate_prefixes(size, context)
+            if not exact or is_canonical(first3, cells)]
+
+def work_units(size, workers, units=None, context=None):
+    '''Return the work units for sets of the given size, for n >= d+4,
+    or for the given units, from the largest to the smallest.'''
+    if units is None:
+        units = prefix_units(size, context)
+    limit = sum(map(unit_size, units)) // (split_factor * workers)
+    return sorted(split_units(units, limit, context), key=unit_size, reverse=True)
+
+def run_unit(unit, context=None):
+    '''Check all sets of a unit, and return the Results.'''
+    context = context or prelim.default_context()
+    fixed_elts = context.fixed_elts
+    prefix, pool, r = unit
+    if exact:
+        combs = canonical_combinations(pool, r, prefix, context)
+    else:
+        combs = combinations(pool, r)
+    if stats.enabled:
+        combs = stats.timed_iter(combs)
+
+    results = Results()
+    if record_codes:
+        results.codes = bytearray()
+        results.first_rank = reduced_rank(prefix + pool[:r], context)
+    counts_before = dict(spectral_tile.prefilter_counts)
+    cache_before = {counter: getattr(spectral_tile, counter) for counter in cache_counters}
+    evaluator = IncrementalEvaluator(len(fixed_elts) + len(prefix), context)
+    for comb in combs:
+        check_set(fixed_elts + prefix + list(comb), results, evaluator,
+                  codes=results.codes, context=context)
+    for rule in results.prefilter_counts:
+        results.prefilter_counts[rule] = \
+            spectral_tile.prefilter_counts[rule] - counts_before[rule]
+    for counter in cache_counters:
+        results.cache_counts[counter] = \
+            getattr(spectral_tile, counter) - cache_before[counter]
+    if stats.enabled:
+        results.stats = stats.take()
+    return results
+
+def run_parallel(units, workers):
+    '''Check the units in a pool of workers, yielding the Results of
+    each unit as soon as it is done.'''
+    context = multiprocessing.get_context('fork')
+    with context.Pool(workers) as pool:
+        for results in pool.imap_unordered(run_unit, units, chunksize=1):
+            yield results
+
+def write_json_atomically(path, data):
+    '''Write data as JSON to the file path, so that the file has either
+    its old or its new contents even if the program is stopped while
+    writing. The new contents go to a temporary file first, which then
+    replaces the old file.'''
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+def shard_units(size, shards, context=None):
+    '''Return the units of all shards together, in the order of
+    generate_sets_reduced. They only depend on size and shards (and
+    exact), so every shard finds the same list.'''
+    units = prefix_units(size, context)
+    return split_units(units, sum(map(unit_size, units)) // (split_factor * shards),
+                       context)
+
+def shard_ranges(units, shards):
+    '''Return the list of the ranges (start, stop) of the indices of
+    the units of each shard.'''
+    sizes = [unit_size(unit) for unit in units]
+    total = sum(sizes)
+    bounds = [0]
+    cumulative = 0
+    for i, unit_sets in enumerate(sizes):
+        cumulative += unit_sets
+        while len(bounds) < shards and cumulative * shards >= total * len(bounds):
+            bounds.append(i+1)
+    while len(bounds) < shards + 1:
+        bounds.append(len(sizes))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def checksum(record):
+    '''Return the SHA-256 hash of the record without its checksum.'''
+    data = {key: value for key, value in record.items() if key != 'checksum'}
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+def shard_record(size, shard, shards, units, start, stop, results, context=None):
+    '''Return the partial results of a shard as a dictionary that can
+    be written as JSON. ranges are the ranges of the indices of the
+    units that were checked, out of the list units of shard_units.'''
+    record = {
+        'dim': (context or prelim.default_context()).dim,
+        'size': size,
+        'exact': exact,
+        'shard': shard,
+        'shards': shards,
+        'total_units': len(units),
+        'ranges': [[start, stop]],
+        'cases': results.cnt,
+        'ans': [[x, y, results.ans[(x, y)]] for (x, y) in results.ans],
+        'counterexamples': [[E, spec_ans, tile_ans]
+                            for E, spec_ans, tile_ans in results.counterexamples],
+    }
+    record['checksum'] = checksum(record)
+    return record
@@ -0,0 +1,230 @@
+'''This is a new file for this fast version of the program.
+
+It collects statistics on where the time of a run goes, for the
+option --stats FILE of main_all.py, which writes them to FILE as JSON
+when the program exits. They are the measurements behind the
+percentages in the docstrings of the other files.
+
+Nothing is collected unless enabled is True. The other files check
+it before recording anything, once per call of is_spectral, is_tile
+and check_set, and once per recursion of the clique searches, which
+is all that it costs when it is False.
+
+
+== The statistics ==
+
+phase_seconds
+    The wall time spent in each phase: 'spectral_setup' and
+    'tile_setup', computing the lists is_ortho_to_0 and
+    is_nonoverlap_with_0 of spectral_tile.py, prefilter included,
+    'incremental_setup', moving the evaluator of incremental.py to
+    the next set, 'clique_search', the clique searches, 'exact_cover',
+    the searches of exact_cover.py, and 'generation', enumerating the
+    sets. With --tile-prune, 'generation' includes the clique searches
+    of may_be_tile, which are also counted in 'clique_search'.
+searches, recursions
+    The numbers of clique searches and of recursions in them, for
+    is_spectral and is_tile separately. The searches answered by the
+    result cache of spectral_tile.py are not counted.
+prunes
+    The number of times each rule of the clique engines of clique.py
+    settled a branch without going further: 'few_candidates', fewer
+    than k candidates left, 'degree', the degree filter, 'exactly_k',
+    exactly k candidates left, which are checked directly, and
+    'colour', the colouring bound.
+candidates, depths
+    Histograms of the numbers of candidates at the start of the
+    searches, and of their depths, that is, the most recursions
+    nested in each other, for is_spectral and is_tile separately.
+
+They are kept for the whole run, as run, and for each prefix
+fst, snd, thd of the sets (see the file generate.py), as by_prefix,
+whose keys are the prefixes written as numbers separated by spaces.
+For other enumerations, the prefix is made of the first three elements
+after the fixed elements. The file also has the total number of
+seconds of the run, the fraction of it spent in each phase, and the
+counts of the prefilter of spectral_tile.py. After --resume, these
+counts cover the whole run, as they are saved in the checkpoints, but
+the other statistics cover only the part run since the resume.
+
+The phases do not cover the whole run, which also spends time in the
+loop of main_all.py, in check_set of the file runner.py, and in
+collecting the statistics themselves, which makes the run about 25%
+slower. For the first 60,000 subsets of size 16 in Z_2^6, the phases
+cover about two thirds of it.
+
+The worker processes of --workers collect their own statistics for
+each unit, and return them with the Results, see take and add. The
+times of the phases are then added up over all workers, so the
+fractions can add up to more than 1.
+'''
+
+import atexit
+import json
+import os
+import time
+
+enabled = False
+clock = time.perf_counter
+
+phases = ['spectral_setup', 'tile_setup', 'incremental_setup',
+          'clique_search', 'exact_cover', 'generation']
+prune_rules = ['few_candidates', 'degree', 'exactly_k', 'colour']
+
+def new_record():
+    return {
+        'sets': 0,
+        'phase_seconds': dict.fromkeys(phases, 0.0),
+        'searches': {'spectral': 0, 'tile': 0},
+        'recursions': {'spectral': 0, 'tile': 0},
+        'prunes': dict.fromkeys(prune_rules, 0),
+        'candidates': {'spectral': {}, 'tile': {}},
+        'depths': {'spectral': {}, 'tile': {}},
+    }
+
+run = new_record()
+by_prefix = {}
+
+# The records that are updated: run, and that of the current prefix.
+records = [run]
+
+started = None
+
+# The times of timed_iter not yet booked, by phase. The time taken to
+# produce a set is booked by start_set, to the prefix of that set.
+pending = {}
+
+# The least k of the recursions of the current clique search.
+lowest_k = None
+
+def enable(path):
+    '''Start collecting, and write the statistics to path at exit.'''
+    global enabled, started
+    enabled = True
+    started = clock()
+    atexit.register(dump, path)
+
+def start_set(prefix):
+    '''Count a new set, whose prefix is the sequence prefix.'''
+    key = ' '.join(map(str, prefix))
+    if key not in by_prefix:
+        by_prefix[key] = new_record()
+    records[1:] = [by_prefix[key]]
+    for record in records:
+        record['sets'] += 1
+    book_pending()
+
+def add_time(phase, since):
+    '''Add the time from since, a value of clock(), to phase.'''
+    seconds = clock() - since
+    for record in records:
+        record['phase_seconds'][phase] += seconds
+
+def book_pending():
+    '''Add the times left pending by timed_iter to the current records.'''
+    for phase, seconds in pending.items():
+        for record in records:
+            record['phase_seconds'][phase] += seconds
+    pending.clear()
+
+def timed_iter(iterable, phase='generation'):
+    '''Yield the items of iterable, adding the time taken to produce
+    each of them to phase. The time is kept pending until the next
+    call of start_set, so that it goes to the prefix of the item
+    produced, not to that of the one before. The time taken to find
+    that there are no more items goes to run only.'''
+    iterator = iter(iterable)
+    while True:
+        since = clock()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            break
+        finally:
+            pending[phase] = pending.get(phase, 0.0) + clock() - since
+        yield item
+
+def start_search(k):
+    '''Start timing a search for a k-clique, and return the time.'''
+    global lowest_k
+    lowest_k = k
+    return clock()
+
+def reached(k):
+    '''Called by the clique engines on each recursion.'''
+    global lowest_k
+    if k < lowest_k:
+        lowest_k = k
+
+def prune(rule):
+    for record in records:
+        record['prunes'][rule] += 1
+
+def end_search(kind, k, candidates, recursions, since):
+    '''Record a search for a k-clique among the given number of
+    candidates, for is_spectral or is_tile according to kind, which
+    made the given number of recursions and started at time since.'''
+    add_time('clique_search', since)
+    depth = k - lowest_k
+    for record in records:
+        record['searches'][kind] += 1
+        record['recursions'][kind] += recursions
+        histogram = record['candidates'][kind]
+        histogram[candidates] = histogram.get(candidates, 0) + 1
+        histogram = record['depths'][kind]
+        histogram[depth] = histogram.get(depth, 0) + 1
+
+def merge_record(record, other):
+    '''Add the counts of other to record, which have the same form,
+    except that the histograms may have different keys.'''
+    for key, value in other.items():
+        if isinstance(value, dict):
+            merge_record(record.setdefault(key, {}), value)
+        else:
+            record[key] = record.get(key, 0) + value
+
+def take():
+    '''Return the statistics collected so far, and start again from
+    zero. This is done by run_unit of the file runner.py.'''
+    global run, by_prefix
+    records[1:] = []
+    book_pending()
+    data = {'run': run, 'by_prefix': by_prefix}
+    run = new_record()
+    by_prefix = {}
+    records[:] = [run]
+    return data
+
+def add(data):
+    '''Add the statistics returned by take, usually in another process.'''
+    merge_record(run, data['run'])
+    for key, record in data['by_prefix'].items():
+        merge_record(by_prefix.setdefault(key, new_record()), record)
+
+def sorted_histograms(record):
+    '''Return a copy of record with the keys of the histograms sorted.'''
+    record = dict(record)
+    for name in ['candidates', 'depths']:
+        record[name] = {kind: dict(sorted(histogram.items()))
+                        for kind, histogram in record[name].items()}
+    return record
+
+def dump(path):
+    import spectral_tile
+
+    records[1:] = []
+    book_pending()
+    seconds = clock() - started
+    data = {
+        'seconds': seconds,
+        'phase_fractions': {phase: run['phase_seconds'][phase] / seconds
+                            for phase in phases},
+        'prefilter_counts': spectral_tile.prefilter_counts,
+        'run': sorted_histograms(run),
+        'by_prefix': {key: sorted_histograms(record)
+                      for key, record in by_prefix.items()},
+    }
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(data, f, indent=1)
+    os.replace(temporary, path)
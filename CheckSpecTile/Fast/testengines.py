@@ -0,0 +1,84 @@
+'''This file checks the clique engines against each other.
+
+It enumerates the subsets of Z_2^5 of sizes 8 and 16 in the same
+way as main_all.py, and checks whether each of them is a spectral set
+and a tile with each of the engines below. It reports any set for
+which an engine gives a different answer from the 'list' engine with
+clique.anchor = False, which is the engine used by main_all.py, and
+the total number of recursions (clique.cnt) of each engine.
+
+Other sizes can be given as arguments, for example
+
+python testengines.py 8 12 16
+
+Checking all 963,879 subsets of size 16 takes about a minute
+per engine.
+'''
+import sys
+
+sizes = [int(x) for x in sys.argv[1:]] or [8, 16]
+
+import prelim
+prelim.set_dimension(5)
+
+from prelim import fixed_elts
+import spectral_tile
+import clique
+from generate import naive_generator, generate_sets_reduced
+
+spectral_tile.quiet = True
+clique.quiet = True
+
+# Pairs (clique_engine, anchor). The first one is the reference.
+engines = [
+    ('list', False),
+    ('list', True),
+    ('bits', False),
+    ('bits', True),
+    ('colour', False),
+    ('colour', True),
+]
+
+def check_all(size):
+    if size - len(fixed_elts) < 3:
+        generator = naive_generator(size)
+    else:
+        generator = generate_sets_reduced(size)
+
+    answers = {engine: [] for engine in engines}
+    recursions = {engine: 0 for engine in engines}
+
+    for comb in generator:
+        E = fixed_elts + comb
+        for engine in engines:
+            spectral_tile.clique_engine, clique.anchor = engine
+
+            spec_ans = spectral_tile.is_spectral(E)
+            if clique.cnt is not None:
+                recursions[engine] += clique.cnt
+                clique.cnt = None
+
+            tile_ans = spectral_tile.is_tile(E)
+            if clique.cnt is not None:
+                recursions[engine] += clique.cnt
+                clique.cnt = None
+
+            answers[engine].append((spec_ans, tile_ans))
+
+    return answers, recursions
+
+all_ok = True
+
+for size in sizes:
+    print('\nSize {}'.format(size))
+    answers, recursions = check_all(size)
+    reference = answers[engines[0]]
+
+    for engine in engines:
+        wrong = sum(a != b for a, b in zip(answers[engine], reference))
+        print('{:>6} anchor={:<5}  recursions: {:>9}  different answers: {}' \
+              .format(engine[0], str(engine[1]), recursions[engine], wrong))
+        if wrong:
+            all_ok = False
+
+print('\nAll engines agree:', all_ok)
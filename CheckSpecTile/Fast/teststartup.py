@@ -0,0 +1,75 @@
+'''This file measures the startup cost of the program.
+
+It reports how long it takes to import prelim.py and spectral_tile.py
+in a new process, which builds no tables since the dimension is not
+known yet. Then, all in this one process, it reports for each
+dimension how long it takes to make the Context of prelim.py, to get
+it again from the cache, to build its tables eval_matrix and table,
+to load table again from the directory prelim.cache_dir, here a new
+temporary directory, and to check
+one set of size a power of 2 with it. The dimensions can be given as
+arguments, for example
+
+python teststartup.py 4 6 8
+
+By default they are 3 to 10.
+'''
+import sys
+import os
+import subprocess
+import tempfile
+import time
+
+dims = [int(x) for x in sys.argv[1:]] or list(range(3, 11))
+
+import prelim
+import spectral_tile
+import clique
+
+prelim.cache_dir = tempfile.mkdtemp()
+
+spectral_tile.quiet = True
+clique.quiet = True
+
+for module in ['prelim', 'spectral_tile']:
+    code = ('import time; start = time.perf_counter(); import {}; '
+            'print(time.perf_counter() - start)').format(module)
+    seconds = float(subprocess.run([sys.executable, '-c', code], capture_output=True,
+                                   text=True, check=True).stdout)
+    print('import {:<14} {:>10.1f} ms'.format(module, 1000 * seconds))
+
+def timed(f):
+    start = time.perf_counter()
+    f()
+    return 1000 * (time.perf_counter() - start)
+
+print('\n{:>4} {:>10} {:>10} {:>12} {:>10} {:>10} {:>10}'.format(
+    'd', 'context', 'cached', 'eval_matrix', 'table', 'from disk', 'check'))
+for dim in dims:
+    path = os.path.join(prelim.cache_dir, 'eval_{}.npy'.format(dim))
+    if os.path.exists(path):
+        os.remove(path)
+    prelim.contexts.pop(dim, None)
+
+    make = timed(lambda: prelim.get_context(dim))
+    again = timed(lambda: prelim.get_context(dim))
+    context = prelim.get_context(dim)
+    lists = timed(lambda: context.eval_matrix)
+    build = timed(lambda: context.table)
+
+    prelim.contexts.pop(dim)
+    load = timed(lambda: prelim.get_context(dim).table)
+    context = prelim.get_context(dim)
+
+    '''The fixed elements and the smallest other elements, up to the
+    smallest power of 2 above d+1, so that neither check is settled by
+    the size of the set alone.'''
+    size = 1 << (dim+1).bit_length()
+    others = [x for x in range(context.N) if x not in context.fixed_elts]
+    E = context.fixed_elts + others[:size - dim - 1]
+    check = timed(lambda: (spectral_tile.is_spectral(E, context),
+                           spectral_tile.is_tile(E, context)))
+
+    print('{:>4} {:>10.3f} {:>10.4f} {:>12.1f} {:>10.2f} {:>10.2f} {:>10.1f}'.format(
+        dim, make, again, lists, build, load, check))
+print('\nAll times in ms.')